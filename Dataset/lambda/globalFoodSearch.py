@@ -1,12 +1,96 @@
+import base64
+import binascii
 import json
+import os
+import re
+import threading
+import time
 import boto3
+from collections import OrderedDict
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from localSearchIndex import LocalSearchIndex
 
 # --- Configuration ---
 HOST = 'search-rms-food-search-domain-zq4q42xavhnjx5p2nwxsgvxjfu.us-east-1.es.amazonaws.com' 
 REGION = 'us-east-1' 
 INDEX_NAME = 'food_index'
 
+# Search backend: 'opensearch' (default) or 'local', an in-process index built by
+# Local_Search_Index_Build.py for dev/staging/small tenants. With 'opensearch' the local
+# index, when deployed, is also the fallback if the domain times out or is unreachable.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'opensearch')
+LOCAL_INDEX_PATH = os.environ.get(
+    'LOCAL_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'food_index.local.json.gz')
+)
+OPENSEARCH_TIMEOUT_SECONDS = float(os.environ.get('OPENSEARCH_TIMEOUT_SECONDS', '3'))
+
+# Result cache for head queries ("pizza", "burger", ...), kept across warm invocations.
+# OpenSearch_Index_From_DynamoDB.py stamps a new _meta.generation on the index mapping
+# after every reindex; when it changes, the whole cache is dropped.
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', '512'))
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+SEARCH_CACHE_TTL_SECONDS = float(os.environ.get('SEARCH_CACHE_TTL_SECONDS', '120'))
+GENERATION_CHECK_SECONDS = float(os.environ.get('SEARCH_GENERATION_CHECK_SECONDS', '30'))
+
+# Paging: ?size=20&cursor=... (cursor wraps the last hit's sort values for search_after)
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TRACK_TOTAL_HITS_UP_TO = 1000
+# Only the fields result cards render
+RESULT_FIELDS = [
+    'menu_item_id', 'restaurant_id', 'restaurant_name', 'cuisine',
+    'name', 'description', 'price', 'category'
+]
+# menu_item_id is unique across the index, so it makes search_after deterministic
+RESULT_TIEBREAK = {'menu_item_id': {'order': 'asc', 'missing': '_last', 'unmapped_type': 'keyword'}}
+RESULT_SORT = [{'_score': 'desc'}, RESULT_TIEBREAK]
+
+# "Near me" (?lat=40.73&lng=-73.99&radius_km=5): a geo_distance filter on the restaurant
+# location, so only local candidates are scored. Results are ordered by distance unless
+# ?sort=relevance is given.
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 50
+SORT_ORDERS = ('relevance', 'distance')
+
+# Tiered execution (?mode=tiered, the default): a cheap phrase-prefix query bounded by
+# timeout/terminate_after runs first, and the fuzzy multi_match only runs when that
+# finds too few hits. ?mode=fuzzy goes straight to the fuzzy query.
+DEFAULT_SEARCH_MODE = os.environ.get('SEARCH_DEFAULT_MODE', 'tiered')
+SEARCH_MODES = ('tiered', 'fuzzy')
+SEARCH_FIELDS = ['name^3', 'description', 'cuisine', 'restaurant_name']
+EXACT_TIER_FIELDS = ['name^3', 'description', 'restaurant_name']
+EXACT_TIER_TIMEOUT = '150ms'
+EXACT_TIER_TERMINATE_AFTER = 5000
+FUZZY_TIER_TIMEOUT = '1s'
+TIERED_MIN_HITS = 5
+
+# Filters (?cuisine=Thai,Japanese&category=Pizza&min_price=5&max_price=20) go in the query's
+# filter context: cached by OpenSearch, not scored, and applied before terminate_after counts.
+# First pages also return facet counts; each facet is counted with every filter except its
+# own, so a user filtering on Thai still sees the other cuisines they could add. Facets that
+# are being filtered on are counted under a global aggregation, which repeats the query.
+TERM_FILTERS = {'cuisine': 'cuisine', 'category': 'category'}
+PRICE_HISTOGRAM_INTERVAL = 5
+FACET_AGGS = {
+    'cuisine': {'terms': {'field': 'cuisine', 'size': 20}},
+    'category': {'terms': {'field': 'category', 'size': 30}},
+    'price': {'histogram': {'field': 'price', 'interval': PRICE_HISTOGRAM_INTERVAL, 'min_doc_count': 1}}
+}
+UNFILTERED_FACETS_AGG = 'unfiltered'
+
+# Typeahead: ?suggest=marg returns item and restaurant name completions from the
+# name_suggest / restaurant_suggest completion fields, with a short-TTL prefix cache.
+SUGGEST_SIZE = 8
+# Options are deduplicated by what they display (item name, restaurant), not by the matched
+# input: word-suffix inputs like "pizza" are shared by every "... Pizza". Fetch extra to
+# still fill SUGGEST_SIZE after dropping repeats.
+SUGGEST_FETCH_SIZE = SUGGEST_SIZE * 4
+MAX_PREFIX_LENGTH = 50
+SUGGEST_CACHE_MAX_ENTRIES = int(os.environ.get('SUGGEST_CACHE_MAX_ENTRIES', '2048'))
+SUGGEST_CACHE_TTL_SECONDS = float(os.environ.get('SUGGEST_CACHE_TTL_SECONDS', '30'))
+
 # --- Initialization ---
 credentials = boto3.Session().get_credentials()
 auth = AWSV4SignerAuth(credentials, REGION, 'es')
@@ -19,20 +103,478 @@ client = OpenSearch(
     connection_class = RequestsHttpConnection
 )
 
+# --- Result Cache ---
+class SearchCache:
+    """
+    LRU cache of serialized search responses, bounded both by entry count and
+    by total body size, with a TTL per entry.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl_seconds):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.generation = None
+        self.generation_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] >= self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, body, now):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (now, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'generation': self.generation,
+            }
+
+search_cache = SearchCache(
+    SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_TTL_SECONDS
+)
+suggest_cache = SearchCache(
+    SUGGEST_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES // 4, SUGGEST_CACHE_TTL_SECONDS
+)
+
+def normalize_query(search_query):
+    """'  Pepperoni   PIZZA ' -> 'pepperoni pizza'"""
+    return re.sub(r'\s+', ' ', search_query).strip().lower()
+
+def cache_key(search_query, query_string_params):
+    """Normalized query plus every other request parameter (filters, paging), in a stable order."""
+    extras = sorted(
+        (name, str(value)) for name, value in query_string_params.items()
+        if name != 'query' and value is not None
+    )
+    return json.dumps([normalize_query(search_query), extras], separators=(',', ':'))
+
+def sync_index_generation(now):
+    """Drop the caches if the index was rebuilt since we last looked."""
+    if SEARCH_BACKEND == 'local':
+        return
+    if now - search_cache.generation_checked_at < GENERATION_CHECK_SECONDS:
+        return
+    search_cache.generation_checked_at = now
+    try:
+        mapping = client.indices.get_mapping(index=INDEX_NAME)
+        meta = mapping.get(INDEX_NAME, {}).get('mappings', {}).get('_meta', {})
+        generation = meta.get('generation')
+    except Exception as e:
+        # Keep serving; entries still expire on their TTL
+        print(f"Index generation check failed: {e}")
+        return
+    if generation != search_cache.generation:
+        if search_cache.generation is not None:
+            print(f"Index generation changed to {generation}; clearing search caches")
+        search_cache.clear()
+        suggest_cache.clear()
+        search_cache.generation = generation
+
+# --- Backends ---
+_local_index = None
+
+def local_index():
+    """The in-process index, loaded on first use (at cold start when SEARCH_BACKEND is 'local')."""
+    global _local_index
+    if _local_index is None:
+        started = time.time()
+        _local_index = LocalSearchIndex.load(LOCAL_INDEX_PATH)
+        print(f"Loaded local index ({len(_local_index.docs)} docs) in {time.time() - started:.3f}s")
+    return _local_index
+
+if SEARCH_BACKEND == 'local':
+    local_index()
+
+def execute_search(search_body):
+    """Run a search body on the configured backend. Returns (response, backend_used)."""
+    if SEARCH_BACKEND == 'local':
+        return local_index().search(search_body), 'local'
+    try:
+        response = client.search(
+            index=INDEX_NAME,
+            body=search_body,
+            request_timeout=OPENSEARCH_TIMEOUT_SECONDS
+        )
+        return response, 'opensearch'
+    except OpenSearchConnectionError as e:
+        # Covers timeouts as well as an unreachable domain
+        if not os.path.exists(LOCAL_INDEX_PATH):
+            raise
+        print(f"OpenSearch unavailable ({e}); falling back to local index")
+        return local_index().search(search_body), 'local'
+
+# --- Paging ---
+def parse_size(raw_size):
+    if raw_size is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(raw_size)
+    except ValueError:
+        raise ValueError('size must be an integer')
+    if size < 1:
+        raise ValueError('size must be positive')
+    return min(size, MAX_PAGE_SIZE)
+
+def encode_cursor(sort_values, tier, order):
+    # Scores are only comparable within one tier, so later pages stay on it
+    raw = json.dumps({'after': sort_values, 'tier': tier, 'order': order}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Returns (sort_values, tier, order)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, dict) or payload.get('tier') not in ('exact', 'fuzzy'):
+        raise ValueError('Invalid cursor')
+    sort_values = payload.get('after')
+    if not isinstance(sort_values, list) or len(sort_values) != len(RESULT_SORT):
+        raise ValueError('Invalid cursor')
+    return sort_values, payload['tier'], payload.get('order', 'relevance')
+
+def is_partial(response):
+    """Timed out, or cut off by terminate_after: hits, total and facets cover only part of the index."""
+    return bool(response.get('timed_out') or response.get('terminated_early'))
+
+def format_results(search_query, response, size, tier, order):
+    hits = response['hits']['hits']
+    total = response['hits'].get('total', {})
+    partial = is_partial(response)
+    next_cursor = None
+    if len(hits) == size and 'sort' in hits[-1]:
+        next_cursor = encode_cursor(hits[-1]['sort'], tier, order)
+    results = {
+        # Normalized, since cached bodies are shared by every spelling of the query
+        'query': normalize_query(search_query),
+        'results': [format_hit(hit, order) for hit in hits],
+        # 'gte' means there are at least this many matches: TRACK_TOTAL_HITS_UP_TO was
+        # reached, or the search stopped early and only counted what it collected
+        'total': total.get('value', len(hits)),
+        'totalRelation': 'gte' if partial else total.get('relation', 'eq'),
+        'nextCursor': next_cursor,
+        'meta': {
+            'tier': tier,
+            'tookMs': response.get('took'),
+            'timedOut': response.get('timed_out', False),
+            'terminatedEarly': response.get('terminated_early', False),
+            # Facet counts are lower bounds too when the search stopped early
+            'partial': partial
+        }
+    }
+    if 'aggregations' in response:
+        results['facets'] = format_facets(response['aggregations'])
+    return results
+
+def format_hit(hit, order):
+    if order != 'distance':
+        return hit['_source']
+    # The first sort value is the distance from the search origin, in km
+    return {**hit['_source'], 'distance_km': round(hit['sort'][0], 2)}
+
+# --- Query Plans ---
+def result_sort(order, origin):
+    if order == 'distance':
+        return [
+            {'_geo_distance': {'location': origin, 'order': 'asc', 'unit': 'km'}},
+            RESULT_TIEBREAK
+        ]
+    return RESULT_SORT
+
+def facet_aggs(match, filters, facet_filters):
+    """
+    Facets without a filter of their own count the hits as they are. A filtered
+    facet has to see past its own filter, so it is counted under a global
+    aggregation from the query and every other filter.
+    """
+    aggs, unfiltered = {}, {}
+    for name, agg in FACET_AGGS.items():
+        if name not in facet_filters:
+            aggs[name] = agg
+            continue
+        others = [clause for facet, clause in facet_filters.items() if facet != name]
+        unfiltered[name] = {
+            'filter': {'bool': {'must': [match], 'filter': filters + others}},
+            'aggs': {'values': agg}
+        }
+    if unfiltered:
+        aggs[UNFILTERED_FACETS_AGG] = {'global': {}, 'aggs': unfiltered}
+    return aggs
+
+def build_search_body(search_query, tier, filters, facet_filters, size, search_after, sort):
+    if tier == 'exact':
+        # Cheap first tier: no term expansion, bounded in time and documents collected
+        match = {
+            'multi_match': {
+                'query': normalize_query(search_query),
+                'type': 'phrase_prefix',
+                'fields': EXACT_TIER_FIELDS
+            }
+        }
+    else:
+        match = {
+            'multi_match': {
+                'query': normalize_query(search_query),
+                # Search across menu item name, description, and cuisine type
+                'fields': SEARCH_FIELDS,
+                'fuzziness': 'AUTO'
+            }
+        }
+
+    search_body = {
+        'query': {
+            'bool': {
+                'must': [match],
+                # Filter context: cached by OpenSearch and not scored
+                'filter': filters + list(facet_filters.values())
+            }
+        },
+        'size': size,
+        '_source': {'includes': RESULT_FIELDS},
+        'sort': sort,
+        'track_total_hits': TRACK_TOTAL_HITS_UP_TO
+    }
+    if tier == 'exact':
+        search_body['timeout'] = EXACT_TIER_TIMEOUT
+        search_body['terminate_after'] = EXACT_TIER_TERMINATE_AFTER
+    else:
+        search_body['timeout'] = FUZZY_TIER_TIMEOUT
+    if search_after is not None:
+        search_body['search_after'] = search_after
+    else:
+        # Facet counts don't change between pages, so only the first page pays for them
+        search_body['aggs'] = facet_aggs(match, filters, facet_filters)
+    return search_body
+
+# --- Filters & Facets ---
+def parse_price(raw_price, name):
+    try:
+        price = float(raw_price)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+    if price < 0:
+        raise ValueError(f'{name} must not be negative')
+    return price
+
+def parse_filters(query_string_params):
+    """Facet name -> filter clause for the cuisine/category/price params."""
+    filters = {}
+    for param, field in TERM_FILTERS.items():
+        values = [v.strip() for v in (query_string_params.get(param) or '').split(',') if v.strip()]
+        if values:
+            filters[param] = {'terms': {field: values}}
+
+    price_range = {}
+    if query_string_params.get('min_price'):
+        price_range['gte'] = parse_price(query_string_params['min_price'], 'min_price')
+    if query_string_params.get('max_price'):
+        price_range['lte'] = parse_price(query_string_params['max_price'], 'max_price')
+    if price_range.get('gte', 0) > price_range.get('lte', float('inf')):
+        raise ValueError('min_price must not exceed max_price')
+    if price_range:
+        filters['price'] = {'range': {'price': price_range}}
+    return filters
+
+def parse_origin(query_string_params):
+    """The "near me" point and radius, or (None, None) when lat/lng aren't given."""
+    raw_lat, raw_lng = query_string_params.get('lat'), query_string_params.get('lng')
+    if not raw_lat and not raw_lng:
+        return None, None
+    try:
+        lat, lon = float(raw_lat), float(raw_lng)
+    except (TypeError, ValueError):
+        raise ValueError('lat and lng must both be numbers')
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('lat/lng out of range')
+
+    radius_km = DEFAULT_RADIUS_KM
+    if query_string_params.get('radius_km'):
+        try:
+            radius_km = float(query_string_params['radius_km'])
+        except ValueError:
+            raise ValueError('radius_km must be a number')
+        if radius_km <= 0:
+            raise ValueError('radius_km must be positive')
+    return {'lat': lat, 'lon': lon}, min(radius_km, MAX_RADIUS_KM)
+
+def format_facets(aggregations):
+    def buckets(name):
+        if name in aggregations:
+            return aggregations[name].get('buckets', [])
+        facet = aggregations.get(UNFILTERED_FACETS_AGG, {}).get(name, {})
+        return facet.get('values', {}).get('buckets', [])
+
+    facets = {}
+    for name in ('cuisine', 'category'):
+        facets[name] = [{'value': b['key'], 'count': b['doc_count']} for b in buckets(name)]
+    facets['price'] = [
+        {'from': b['key'], 'to': b['key'] + PRICE_HISTOGRAM_INTERVAL, 'count': b['doc_count']}
+        for b in buckets('price')
+    ]
+    return facets
+
+# --- Typeahead ---
+def suggest_body(prefix):
+    completion = {'size': SUGGEST_FETCH_SIZE}
+    return {
+        'suggest': {
+            'items': {'prefix': prefix, 'completion': {'field': 'name_suggest', **completion}},
+            'restaurants': {'prefix': prefix, 'completion': {'field': 'restaurant_suggest', **completion}}
+        },
+        '_source': ['restaurant_id', 'restaurant_name', 'name'],
+        # Suggestions only; skip the regular (match_all) hits
+        'size': 0
+    }
+
+def format_suggestions(prefix, response):
+    suggest = response.get('suggest', {})
+
+    def options(name, text_field, dedupe_key):
+        entries = suggest.get(name) or [{}]
+        results, seen = [], set()
+        for option in entries[0].get('options', []):
+            suggestion = {
+                'text': option['_source'].get(text_field, option['text']),
+                'restaurant_id': option['_source'].get('restaurant_id')
+            }
+            key = dedupe_key(suggestion)
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append(suggestion)
+            if len(results) == SUGGEST_SIZE:
+                break
+        return results
+
+    return {
+        'prefix': prefix,
+        # Same-named items across restaurants collapse; different items never do
+        'items': options('items', 'name', lambda s: str(s['text']).lower()),
+        # Every menu item carries its restaurant's name, so one entry per restaurant
+        'restaurants': options('restaurants', 'restaurant_name', lambda s: s['restaurant_id'] or s['text'])
+    }
+
+def handle_suggest(raw_prefix):
+    prefix = normalize_query(raw_prefix)[:MAX_PREFIX_LENGTH]
+    if not prefix:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Missing suggest prefix'})
+        }
+
+    now = time.time()
+    sync_index_generation(now)
+    cached_body = suggest_cache.get(prefix, now)
+    if cached_body is not None:
+        return {
+            'statusCode': 200,
+            'headers': {'X-Cache': 'HIT'},
+            'body': cached_body
+        }
+
+    try:
+        response, backend = execute_search(suggest_body(prefix))
+    except Exception as e:
+        print(f"OpenSearch Suggest Error: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'OpenSearch suggest failed: {str(e)}'})
+        }
+
+    body = json.dumps(format_suggestions(prefix, response))
+    # Fallback answers aren't cached, so OpenSearch results return as soon as it recovers
+    if backend == SEARCH_BACKEND:
+        suggest_cache.put(prefix, body, now)
+    return {
+        'statusCode': 200,
+        'headers': {'X-Cache': 'MISS', 'X-Search-Backend': backend},
+        'body': body
+    }
+
 def lambda_handler(event, context):
     
     # 1. Extract the search query from the API Gateway event
     try:
         # Expecting query from query string parameters (e.g., /search/global?query=pizza)
-        query_string_params = event.get('queryStringParameters', {})
+        query_string_params = event.get('queryStringParameters') or {}
         search_query = query_string_params.get('query')
+
+        # Typeahead mode (e.g., /search/global?suggest=marg)
+        if 'suggest' in query_string_params:
+            return handle_suggest(query_string_params.get('suggest') or '')
         
-        if not search_query:
+        if not search_query or not search_query.strip():
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Missing search query parameter: "query"'})
             }
+
+        size = parse_size(query_string_params.get('size'))
+        cursor = query_string_params.get('cursor')
+        search_after, cursor_tier, cursor_order = decode_cursor(cursor) if cursor else (None, None, None)
+        facet_filters = parse_filters(query_string_params)
+        filters = []
+        mode = query_string_params.get('mode') or DEFAULT_SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f'mode must be one of: {", ".join(SEARCH_MODES)}')
+
+        # "Near me" mode: only restaurants within the radius are candidates
+        origin, radius_km = parse_origin(query_string_params)
+        if origin:
+            filters.append({'geo_distance': {'distance': f'{radius_km}km', 'location': origin}})
+        order = query_string_params.get('sort') or ('distance' if origin else 'relevance')
+        if order not in SORT_ORDERS:
+            raise ValueError(f'sort must be one of: {", ".join(SORT_ORDERS)}')
+        if order == 'distance' and not origin:
+            raise ValueError('sort=distance requires lat and lng')
+        if cursor_order and cursor_order != order:
+            raise ValueError('Cursor does not match this sort order')
         
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(e)})
+        }
+
     except Exception as e:
         print(f"Error parsing event: {e}")
         return {
@@ -40,31 +582,48 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Invalid event format'})
         }
 
-    # 2. Build the OpenSearch query body
-    search_body = {
-        'query': {
-            'multi_match': {
-                'query': search_query,
-                # Search across menu item name, description, and cuisine type
-                'fields': ['name^3', 'description', 'cuisine', 'restaurant_name'],
-                'fuzziness': 'AUTO'
-            }
+    # 2. Serve repeated queries from the warm-container cache
+    now = time.time()
+    sync_index_generation(now)
+    key = cache_key(search_query, query_string_params)
+    cached_body = search_cache.get(key, now)
+    if cached_body is not None:
+        print("Search cache HIT:", json.dumps(search_cache.stats()))
+        return {
+            'statusCode': 200,
+            'headers': {'X-Cache': 'HIT'},
+            'body': cached_body
         }
-    }
 
-    # 3. Execute the search
+    # 3. Pick the query plan: later pages stay on the tier that answered the first one
+    if cursor_tier:
+        tiers = [cursor_tier]
+    elif mode == 'tiered':
+        tiers = ['exact', 'fuzzy']
+    else:
+        tiers = ['fuzzy']
+
+    # 4. Execute the search, escalating to the next tier only when a tier finds too few hits
     try:
-        response = client.search(
-            index=INDEX_NAME,
-            body=search_body
-        )
+        for tier in tiers:
+            search_body = build_search_body(
+                search_query, tier, filters, facet_filters, size, search_after, result_sort(order, origin)
+            )
+            response, backend = execute_search(search_body)
+            if len(response['hits']['hits']) >= min(size, TIERED_MIN_HITS):
+                break
         
-        # 4. Extract and format the results (getting the source document)
-        results = [hit['_source'] for hit in response['hits']['hits']]
+        # 5. Extract and format the results (getting the source document)
+        body = json.dumps(format_results(search_query, response, size, tier, order))
+        # Partial answers from a slow moment aren't worth repeating for the whole TTL
+        if backend == SEARCH_BACKEND and not is_partial(response):
+            search_cache.put(key, body, now)
+        print("Search cache MISS:", json.dumps(search_cache.stats()))
             
         return {
             'statusCode': 200,
-            'body': json.dumps(results)
+            'headers': {'X-Cache': 'MISS', 'X-Search-Backend': backend},
+            'body': body
         }
         
     except Exception as e:
@@ -72,4 +631,4 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'body': json.dumps({'error': f'OpenSearch query failed: {str(e)}'})
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,114 @@
+import json
+import mmap
+import struct
+import sys
+from collections import defaultdict
+
+# --- Configuration ---
+# Binary neighbor file written by Dataset/scripts/Recommender_Build.py. Everything is
+# little-endian and laid out so the arrays can be used straight from a memory map:
+#   header      MAGIC, FORMAT_VERSION, n_items, k, n_users, n_history, ids_bytes
+#   neighbors   int32[n_items * k]     neighbor item index per slot, -1 when unused
+#   scores      float32[n_items * k]   item-item similarity, descending per item
+#   user_indptr int32[n_users + 1]     CSR row pointers into the two history arrays
+#   user_items  int32[n_history]       items each user interacted with
+#   user_weights float32[n_history]    interaction strength (orders + ratings)
+#   ids         JSON {"items": [...], "users": [...]}  external ids, by index
+MAGIC = b'RNBR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4s6I')
+
+
+def write_neighbor_file(path, item_ids, neighbors, scores, user_ids, user_indptr, user_items, user_weights, k):
+    """
+    Array arguments are anything exposing the buffer protocol with the dtype
+    listed above (the build script passes NumPy arrays).
+    """
+    ids = json.dumps({'items': list(item_ids), 'users': list(user_ids)}, separators=(',', ':')).encode('utf-8')
+    n_history = len(user_items)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(item_ids), k, len(user_ids), n_history, len(ids)))
+        for array in (neighbors, scores, user_indptr, user_items, user_weights):
+            f.write(memoryview(array).cast('B'))
+        f.write(ids)
+
+
+class NeighborIndex:
+    """
+    Read-only view over a neighbor file. Loading maps the file and decodes only
+    the id table; recommendations touch k slots per history item, so a call
+    costs microseconds and the arrays never have to be copied onto the heap.
+    """
+
+    def __init__(self, buffer, item_ids, user_ids, n_items, k, n_users, n_history):
+        self._buffer = buffer
+        self.item_ids = item_ids
+        self.user_ids = user_ids
+        self.k = k
+        self.item_index = {item_id: i for i, item_id in enumerate(item_ids)}
+        self.user_index = {user_id: u for u, user_id in enumerate(user_ids)}
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+        sizes = (('i', n_items * k), ('f', n_items * k), ('i', n_users + 1), ('i', n_history), ('f', n_history))
+        arrays = []
+        for typecode, count in sizes:
+            arrays.append(view[offset:offset + 4 * count].cast(typecode))
+            offset += 4 * count
+        self.neighbors, self.scores, self.user_indptr, self.user_items, self.user_weights = arrays
+
+    @classmethod
+    def load(cls, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError("Neighbor files are little-endian")
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_items, k, n_users, n_history, ids_bytes = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} neighbor file")
+        ids = json.loads(buffer[len(buffer) - ids_bytes:].decode('utf-8'))
+        return cls(buffer, ids['items'], ids['users'], n_items, k, n_users, n_history)
+
+    def history(self, user_id):
+        """[(item index, weight)] for a user in the file; empty for unknown users."""
+        u = self.user_index.get(user_id)
+        if u is None:
+            return []
+        start, end = self.user_indptr[u], self.user_indptr[u + 1]
+        return list(zip(self.user_items[start:end], self.user_weights[start:end]))
+
+    def similar(self, item_id, n=10):
+        i = self.item_index.get(item_id)
+        if i is None:
+            return []
+        base = i * self.k
+        results = []
+        for slot in range(base, base + min(n, self.k)):
+            j = self.neighbors[slot]
+            if j < 0:
+                break
+            results.append((self.item_ids[j], self.scores[slot]))
+        return results
+
+    def recommend_for_history(self, history, n=10, exclude_seen=True):
+        """
+        Item-based CF: each history item votes for its neighbors with
+        weight * similarity. history is [(item index, weight)].
+        """
+        scores = defaultdict(float)
+        for i, weight in history:
+            base = i * self.k
+            for slot in range(base, base + self.k):
+                j = self.neighbors[slot]
+                if j < 0:
+                    break
+                scores[j] += weight * self.scores[slot]
+        if exclude_seen:
+            for i, _ in history:
+                scores.pop(i, None)
+        ranked = sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))[:n]
+        return [self.item_ids[j] for j, _ in ranked]
+
+    def recommend(self, user_id, n=10, exclude_seen=True):
+        """Restaurant ids for a known user; empty when the user has no history in the file."""
+        return self.recommend_for_history(self.history(user_id), n, exclude_seen)
@@ -0,0 +1,426 @@
+import gzip
+import json
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+# --- Configuration ---
+# Same fields and boosts as the globalFoodSearch multi_match
+FIELD_BOOSTS = {
+    'name': 3.0,
+    'description': 1.0,
+    'cuisine': 1.0,
+    'restaurant_name': 1.0,
+}
+# Completion fields served by the typeahead mode, and the document field they complete
+SUGGEST_FIELDS = {
+    'name_suggest': 'name',
+    'restaurant_suggest': 'restaurant_name',
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_EXPANSIONS = 50
+FORMAT_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+EARTH_RADIUS_KM = 6371.0088
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def auto_fuzziness(term):
+    """OpenSearch's fuzziness AUTO: exact for 1-2 chars, 1 edit for 3-5, 2 edits beyond."""
+    if len(term) <= 2:
+        return 0
+    if len(term) <= 5:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """Levenshtein distance between a and b, or None as soon as it must exceed max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    distance = previous[-1]
+    return distance if distance <= max_distance else None
+
+
+def parse_boosts(fields):
+    """['name^3', 'description'] -> {'name': 3.0, 'description': 1.0}, limited to indexed fields."""
+    if not fields:
+        return None
+    boosts = {}
+    for spec in fields:
+        field, _, boost = spec.partition('^')
+        if field in FIELD_BOOSTS:
+            boosts[field] = float(boost) if boost else 1.0
+    return boosts or None
+
+
+def haversine_km(origin, location):
+    lat1, lon1 = math.radians(origin['lat']), math.radians(origin['lon'])
+    lat2, lon2 = math.radians(location['lat']), math.radians(location['lon'])
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_distance_km(distance):
+    """'10km' / '500m' / 10 -> kilometres."""
+    text = str(distance).strip().lower()
+    if text.endswith('km'):
+        return float(text[:-2])
+    if text.endswith('m'):
+        return float(text[:-1]) / 1000
+    return float(text)
+
+
+def matches_filter(doc, clause):
+    """Evaluate a terms, range, geo_distance or bool filter clause against a document."""
+    if 'bool' in clause:
+        return all(matches_filter(doc, inner) for inner in clause['bool'].get('filter', []))
+    if 'terms' in clause:
+        field, values = next(iter(clause['terms'].items()))
+        return doc.get(field) in values
+    if 'range' in clause:
+        field, bounds = next(iter(clause['range'].items()))
+        value = doc.get(field)
+        if value is None:
+            return False
+        return (
+            value >= bounds.get('gte', value) and value <= bounds.get('lte', value)
+            and ('gt' not in bounds or value > bounds['gt'])
+            and ('lt' not in bounds or value < bounds['lt'])
+        )
+    if 'geo_distance' in clause:
+        spec = dict(clause['geo_distance'])
+        max_km = parse_distance_km(spec.pop('distance'))
+        field, origin = next(iter(spec.items()))
+        location = doc.get(field)
+        return location is not None and haversine_km(origin, location) <= max_km
+    raise ValueError(f"Unsupported filter for the local index: {clause}")
+
+
+def aggregate(docs, spec):
+    """terms and histogram aggregations, in OpenSearch's shape."""
+    if 'terms' in spec:
+        field, size = spec['terms']['field'], spec['terms'].get('size', 10)
+        counts = Counter(doc[field] for doc in docs if doc.get(field) is not None)
+        ranked = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:size]
+        return {'buckets': [{'key': key, 'doc_count': count} for key, count in ranked]}
+    if 'histogram' in spec:
+        field, interval = spec['histogram']['field'], spec['histogram']['interval']
+        counts = Counter(
+            math.floor(doc[field] / interval) * interval
+            for doc in docs if doc.get(field) is not None
+        )
+        return {'buckets': [{'key': key, 'doc_count': counts[key]} for key in sorted(counts)]}
+    raise ValueError(f"Unsupported aggregation for the local index: {spec}")
+
+
+class LocalSearchIndex:
+    """
+    In-process inverted index over food_index documents with BM25 scoring
+    and fuzzy term expansion. search() accepts the subset of the OpenSearch
+    request body that globalFoodSearch sends and returns a response of the
+    same shape, so it can stand in for the OpenSearch domain.
+    """
+
+    def __init__(self, docs, postings, lengths):
+        self.docs = docs
+        # field -> term -> [doc, tf, doc, tf, ...]
+        self.postings = postings
+        # field -> [length of that field in each doc]
+        self.lengths = lengths
+        self.avg_lengths = {
+            field: (sum(field_lengths) / len(field_lengths)) if field_lengths else 0.0
+            for field, field_lengths in lengths.items()
+        }
+        self.vocabulary = sorted({term for terms in postings.values() for term in terms})
+        self._vocabulary_by_length = defaultdict(list)
+        for term in self.vocabulary:
+            self._vocabulary_by_length[len(term)].append(term)
+        self._suggest_inputs = self._build_suggest_inputs()
+
+    # --- Building & Serialization ---
+    @classmethod
+    def build(cls, documents):
+        """Index an iterable of food_index source documents."""
+        docs = []
+        postings = {field: defaultdict(list) for field in FIELD_BOOSTS}
+        lengths = {field: [] for field in FIELD_BOOSTS}
+
+        for doc in documents:
+            doc_id = len(docs)
+            docs.append(doc)
+            for field in FIELD_BOOSTS:
+                tokens = tokenize(doc.get(field, ''))
+                lengths[field].append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    postings[field][term].extend((doc_id, tf))
+
+        return cls(docs, {field: dict(terms) for field, terms in postings.items()}, lengths)
+
+    def save(self, path):
+        payload = {
+            'version': FORMAT_VERSION,
+            'docs': self.docs,
+            'postings': self.postings,
+            'lengths': self.lengths,
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported local index format: {payload.get('version')}")
+        return cls(payload['docs'], payload['postings'], payload['lengths'])
+
+    # --- Search ---
+    def expand(self, term):
+        """Vocabulary terms within the AUTO edit distance of term, as {term: weight}."""
+        max_distance = auto_fuzziness(term)
+        expansions = {}
+        for length in range(len(term) - max_distance, len(term) + max_distance + 1):
+            for candidate in self._vocabulary_by_length.get(length, ()):
+                distance = bounded_edit_distance(term, candidate, max_distance)
+                if distance is not None:
+                    # Like Lucene, closer matches score higher
+                    expansions[candidate] = 1.0 - distance / max(len(term), len(candidate))
+        best = sorted(expansions.items(), key=lambda kv: (-kv[1], kv[0]))[:MAX_EXPANSIONS]
+        return dict(best)
+
+    def expand_prefix(self, prefix):
+        """Vocabulary terms starting with prefix (the last word of a phrase_prefix query)."""
+        start = bisect_left(self.vocabulary, prefix)
+        expansions = {}
+        for term in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expansions[term] = 1.0
+        return expansions
+
+    def score(self, query_text, fuzzy=True, phrase_prefix=False, boosts=None):
+        """
+        BM25 best_fields scores ({doc: score}) for a multi_match over the
+        boosted fields. phrase_prefix requires every term in the same field
+        and prefix-matches the last one; without positions, word order and
+        adjacency are not checked.
+        """
+        boosts = boosts or FIELD_BOOSTS
+        n_docs = len(self.docs)
+        field_scores = {field: defaultdict(float) for field in boosts}
+        field_matches = {field: Counter() for field in boosts}
+
+        query_terms = list(dict.fromkeys(tokenize(query_text)))
+        for position, query_term in enumerate(query_terms):
+            if phrase_prefix:
+                is_last = position == len(query_terms) - 1
+                expansions = self.expand_prefix(query_term) if is_last else {query_term: 1.0}
+            else:
+                expansions = self.expand(query_term) if fuzzy else {query_term: 1.0}
+            for field, boost in boosts.items():
+                field_postings = self.postings.get(field, {})
+                field_lengths = self.lengths.get(field, [])
+                avg_length = self.avg_lengths.get(field) or 1.0
+                # A query term contributes its best expansion per document
+                best = {}
+                for term, weight in expansions.items():
+                    entries = field_postings.get(term)
+                    if not entries:
+                        continue
+                    df = len(entries) // 2
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    for i in range(0, len(entries), 2):
+                        doc_id, tf = entries[i], entries[i + 1]
+                        norm = BM25_K1 * (1 - BM25_B + BM25_B * field_lengths[doc_id] / avg_length)
+                        term_score = boost * weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                        if term_score > best.get(doc_id, 0.0):
+                            best[doc_id] = term_score
+                for doc_id, term_score in best.items():
+                    field_scores[field][doc_id] += term_score
+                    field_matches[field][doc_id] += 1
+
+        if phrase_prefix:
+            for field, per_doc in field_scores.items():
+                for doc_id in [d for d in per_doc if field_matches[field][d] < len(query_terms)]:
+                    del per_doc[doc_id]
+
+        # best_fields: a document scores as its best matching field
+        scores = defaultdict(float)
+        for per_doc in field_scores.values():
+            for doc_id, field_score in per_doc.items():
+                if field_score > scores[doc_id]:
+                    scores[doc_id] = field_score
+        return scores
+
+    def query_scores(self, query):
+        """{doc: score} for a multi_match query, or a bool with one in must and filter clauses."""
+        filters = []
+        if 'bool' in query:
+            filters = query['bool'].get('filter', [])
+            query = (query['bool'].get('must') or [{}])[0]
+        multi_match = query.get('multi_match', {})
+        scores = self.score(
+            multi_match.get('query', ''),
+            fuzzy='fuzziness' in multi_match,
+            phrase_prefix=multi_match.get('type') == 'phrase_prefix',
+            boosts=parse_boosts(multi_match.get('fields')),
+        )
+        if filters:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if all(matches_filter(self.docs[doc_id], clause) for clause in filters)
+            }
+        return scores
+
+    def aggregate(self, doc_ids, spec):
+        """
+        aggregate() over doc ids, plus global and filter aggregations (with
+        sub-aggregations). A filter holding a query in bool.must is scored first.
+        """
+        if 'global' in spec:
+            selected = list(range(len(self.docs)))
+        elif 'filter' in spec:
+            clause = spec['filter']
+            if 'bool' in clause and clause['bool'].get('must'):
+                matches = self.query_scores(clause)
+                selected = [doc_id for doc_id in doc_ids if doc_id in matches]
+            else:
+                selected = [doc_id for doc_id in doc_ids if matches_filter(self.docs[doc_id], clause)]
+        else:
+            return aggregate([self.docs[doc_id] for doc_id in doc_ids], spec)
+        result = {'doc_count': len(selected)}
+        for name, sub_spec in spec.get('aggs', {}).items():
+            result[name] = self.aggregate(selected, sub_spec)
+        return result
+
+    def search(self, body):
+        """
+        Run an OpenSearch-style request body: a multi_match query or a
+        completion suggest, plus aggs, post_filter, size, search_after,
+        _source and track_total_hits.
+        """
+        if 'suggest' in body:
+            return {
+                'hits': {'total': {'value': 0, 'relation': 'eq'}, 'hits': []},
+                'suggest': self.suggest(body['suggest']),
+            }
+
+        scores = self.query_scores(body.get('query', {}))
+
+        # Aggregations see every query match; post_filter only narrows the hits
+        matched = list(scores)
+        if body.get('post_filter'):
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if matches_filter(self.docs[doc_id], body['post_filter'])
+            }
+
+        # Primary key is score desc or, for a _geo_distance sort, distance asc;
+        # menu_item_id asc breaks ties either way
+        geo_sort = next(
+            (clause['_geo_distance'] for clause in body.get('sort', []) if '_geo_distance' in clause),
+            None
+        )
+        if geo_sort:
+            geo_field, origin = next((k, v) for k, v in geo_sort.items() if isinstance(v, dict))
+            primary = {
+                doc_id: haversine_km(origin, self.docs[doc_id][geo_field])
+                for doc_id in scores if self.docs[doc_id].get(geo_field)
+            }
+            direction = 1
+        else:
+            primary = scores
+            direction = -1
+        ranked = sorted(
+            (
+                (value, self.docs[doc_id].get('menu_item_id') or '', doc_id)
+                for doc_id, value in primary.items()
+            ),
+            key=lambda entry: (direction * entry[0], entry[1]),
+        )
+        if body.get('search_after'):
+            after_value, after_id = body['search_after'][0], body['search_after'][1] or ''
+            ranked = [
+                entry for entry in ranked
+                if (direction * entry[0], entry[1]) > (direction * after_value, after_id)
+            ]
+
+        size = body.get('size', 10)
+        includes = body.get('_source')
+        if isinstance(includes, dict):
+            includes = includes.get('includes')
+        hits = []
+        for value, menu_item_id, doc_id in ranked[:size]:
+            doc = self.docs[doc_id]
+            source = {field: doc[field] for field in includes if field in doc} if includes else doc
+            hits.append({
+                '_id': f"{doc.get('restaurant_id')}-{menu_item_id}",
+                '_score': scores[doc_id],
+                '_source': source,
+                'sort': [value, menu_item_id],
+            })
+
+        total = len(scores)
+        track_total_hits = body.get('track_total_hits', 10000)
+        if isinstance(track_total_hits, int) and total > track_total_hits:
+            total_info = {'value': track_total_hits, 'relation': 'gte'}
+        else:
+            total_info = {'value': total, 'relation': 'eq'}
+        response = {'took': 0, 'timed_out': False, 'hits': {'total': total_info, 'hits': hits}}
+        if body.get('aggs'):
+            response['aggregations'] = {
+                name: self.aggregate(matched, spec) for name, spec in body['aggs'].items()
+            }
+        return response
+
+    # --- Typeahead ---
+    def _build_suggest_inputs(self):
+        # Same inputs as the reindex script: each name plus its word-suffixes
+        inputs = {}
+        for suggest_field, field in SUGGEST_FIELDS.items():
+            entries = set()
+            for doc_id, doc in enumerate(self.docs):
+                words = str(doc.get(field, '')).split()
+                for i in range(min(len(words), 5)):
+                    entries.add((' '.join(words[i:]).lower(), doc_id))
+            inputs[suggest_field] = sorted(entries)
+        return inputs
+
+    def suggest(self, suggest_body):
+        """Prefix completion over the name inputs, shaped like OpenSearch's completion suggester."""
+        results = {}
+        for name, spec in suggest_body.items():
+            prefix = spec.get('prefix', '').lower()
+            completion = spec.get('completion', {})
+            entries = self._suggest_inputs.get(completion.get('field'), [])
+            size = completion.get('size', 5)
+            options, seen = [], set()
+            for text, doc_id in entries[bisect_left(entries, (prefix, -1)):]:
+                if not text.startswith(prefix) or len(options) >= size:
+                    break
+                if completion.get('skip_duplicates') and text in seen:
+                    continue
+                seen.add(text)
+                options.append({'text': text, '_source': self.docs[doc_id]})
+            results[name] = [{'text': prefix, 'options': options}]
+        return results
@@ -6,12 +6,16 @@ from decimal import Decimal
 # IMPORTANT: Change these values to match your setup
 AWS_REGION = 'us-east-1' 
 DYNAMODB_TABLE_NAME = 'RestaurantMenu' 
+MENU_VERSION_TABLE_NAME = 'RestaurantMenuVersions' # Read by getRestaurantMenu to invalidate its cache
+RESTAURANTS_TABLE_NAME = 'Restaurants' # One summary row per restaurant (PK restaurant_id), read by getRestaurantRecommendations
 JSON_FILE_PATH = 'cleaned_restaurant_data.json'
 
 # Initialize DynamoDB resource client (it uses your local 'aws configure' credentials)
 try:
     dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
     table = dynamodb.Table(DYNAMODB_TABLE_NAME)
+    version_table = dynamodb.Table(MENU_VERSION_TABLE_NAME)
+    restaurants_table = dynamodb.Table(RESTAURANTS_TABLE_NAME)
 except Exception as e:
     print(f"Error initializing DynamoDB: {e}")
     print("Ensure your AWS credentials and region are correctly configured.")
@@ -37,6 +41,9 @@ with table.batch_writer() as batch:
         r_id = str(restaurant['id'])
         r_name = restaurant['name']
         r_cuisine = restaurant['cuisine']
+        # Location is optional; missing coordinates come through as null
+        r_lat = restaurant.get('lat')
+        r_lng = restaurant.get('lng')
         
         # Iterate over each menu item in the 'menu' list
         for item in restaurant['menu']:
@@ -52,9 +59,38 @@ with table.batch_writer() as batch:
                 'price': Decimal(str(item['price'])),             # Ensure it's a number/float type
                 'category': item['category']                 # Used by the CategoryIndex GSI (String)
             }
+            if r_lat is not None and r_lng is not None:
+                db_item['lat'] = Decimal(str(r_lat))          # Restaurant location for geo search
+                db_item['lng'] = Decimal(str(r_lng))
             batch.put_item(Item=db_item)
             total_items += 1
 
 print(f"✅ DynamoDB ingestion successful. Total menu items added: {total_items}")
 
+# Restaurant-level summaries, so callers can batch-read name and cuisine by restaurant_id
+with restaurants_table.batch_writer() as batch:
+    for restaurant in data:
+        summary = {
+            'restaurant_id': str(restaurant['id']),
+            'name': restaurant['name'],
+            'cuisine': restaurant['cuisine']
+        }
+        if restaurant.get('lat') is not None and restaurant.get('lng') is not None:
+            summary['lat'] = Decimal(str(restaurant['lat']))
+            summary['lng'] = Decimal(str(restaurant['lng']))
+        batch.put_item(Item=summary)
+
+print(f"✅ Restaurant summaries written for {len(data)} restaurants in {RESTAURANTS_TABLE_NAME}")
+
+# Bump each restaurant's menu version so warm getRestaurantMenu containers
+# drop their cached copy on the next request instead of waiting for the TTL.
+for restaurant in data:
+    version_table.update_item(
+        Key={'restaurant_id': str(restaurant['id'])},
+        UpdateExpression='ADD version :one',
+        ExpressionAttributeValues={':one': 1}
+    )
+
+print(f"✅ Menu versions bumped for {len(data)} restaurants in {MENU_VERSION_TABLE_NAME}")
+
 # After running this script, you can verify the data in the AWS console under the 'Items' tab of your table.
\ No newline at end of file
@@ -92,7 +92,10 @@ df_restaurants.rename(columns={
 
 # Select only the relevant columns for the final restaurant object
 # We include 'full_address' for potential future use and exclude it from the final JSON later.
-df_restaurants_clean = df_restaurants[['id', 'name', 'rating', 'cuisine']].copy()
+# 'lat'/'lng' are kept for geo search (they become the 'location' geo_point in OpenSearch).
+df_restaurants_clean = df_restaurants[['id', 'name', 'rating', 'cuisine', 'lat', 'lng']].copy()
+df_restaurants_clean['lat'] = pd.to_numeric(df_restaurants_clean['lat'], errors='coerce')
+df_restaurants_clean['lng'] = pd.to_numeric(df_restaurants_clean['lng'], errors='coerce')
 
 # Add a placeholder 'image' column since it is REQUIRED by the API contract:
 df_restaurants_clean['image'] = 'https://s3.amazonaws.com/project-assets/default-restaurant.jpg' 
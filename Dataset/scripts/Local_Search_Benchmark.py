@@ -0,0 +1,89 @@
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+from localSearchIndex import LocalSearchIndex
+
+# --- Configuration ---
+LOCAL_INDEX_PATH = 'food_index.local.json.gz'
+# Set to False to benchmark only the in-process index (no AWS credentials needed)
+BENCHMARK_OPENSEARCH = True
+HOST = 'search-rms-food-search-domain-zq4q42xavhnjx5p2nwxsgvxjfu.us-east-1.es.amazonaws.com'
+REGION = 'us-east-1'
+INDEX_NAME = 'food_index'
+ROUNDS = 20
+
+# Head queries plus a few typos to exercise fuzzy matching
+QUERIES = [
+    'pizza', 'burger', 'sushi', 'chicken wings', 'margherita',
+    'piza', 'burgr', 'pad thai', 'salad', 'coffee'
+]
+
+
+def search_body(query):
+    # Same request globalFoodSearch sends for a first page
+    return {
+        'query': {
+            'multi_match': {
+                'query': query,
+                'fields': ['name^3', 'description', 'cuisine', 'restaurant_name'],
+                'fuzziness': 'AUTO'
+            }
+        },
+        'size': 20,
+        '_source': {'includes': ['menu_item_id', 'restaurant_id', 'restaurant_name', 'name', 'price']},
+        'sort': [
+            {'_score': 'desc'},
+            {'menu_item_id': {'order': 'asc', 'missing': '_last', 'unmapped_type': 'keyword'}}
+        ],
+        'track_total_hits': 1000
+    }
+
+
+def benchmark(name, run):
+    latencies = []
+    for _ in range(ROUNDS):
+        for query in QUERIES:
+            started = time.perf_counter()
+            run(search_body(query))
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<12} n={len(latencies):<5} p50={statistics.median(latencies):8.2f} ms  "
+          f"p95={p95:8.2f} ms  max={latencies[-1]:8.2f} ms")
+
+
+if __name__ == '__main__':
+    started = time.perf_counter()
+    index = LocalSearchIndex.load(LOCAL_INDEX_PATH)
+    print(f"Loaded {len(index.docs)} documents in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    benchmark('local', index.search)
+
+    if BENCHMARK_OPENSEARCH:
+        import boto3
+        from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+
+        client = OpenSearch(
+            hosts = [{'host': HOST, 'port': 443}],
+            http_auth = AWSV4SignerAuth(boto3.Session().get_credentials(), REGION, 'es'),
+            use_ssl = True,
+            verify_certs = True,
+            connection_class = RequestsHttpConnection
+        )
+        try:
+            benchmark('opensearch', lambda body: client.search(index=INDEX_NAME, body=body))
+        except Exception as e:
+            print(f"🛑 OpenSearch benchmark failed: {e}")
+            exit()
+
+        # Overlap of the top results, as a sanity check that both backends rank alike
+        print()
+        for query in QUERIES:
+            remote_hits = client.search(index=INDEX_NAME, body=search_body(query))['hits']['hits']
+            local_hits = index.search(search_body(query))['hits']['hits']
+            remote_ids = {hit['_source'].get('menu_item_id') for hit in remote_hits[:10]}
+            local_ids = {hit['_source'].get('menu_item_id') for hit in local_hits[:10]}
+            print(f"top-10 overlap for {query!r}: {len(remote_ids & local_ids)}/10")
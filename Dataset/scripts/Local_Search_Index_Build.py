@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import time
+
+# The index module ships with the search Lambda
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+from localSearchIndex import LocalSearchIndex
+
+# --- Configuration ---
+# 'json' reads the output of Kaggle_dataset.py; 'dynamodb' scans the RestaurantMenu table
+SOURCE = 'json'
+JSON_FILE_PATH = 'cleaned_restaurant_data.json'
+AWS_REGION = 'us-east-1'
+DYNAMODB_TABLE_NAME = 'RestaurantMenu'
+# Deploy this file next to globalFoodSearch.py (or point LOCAL_INDEX_PATH at it)
+OUTPUT_PATH = 'food_index.local.json.gz'
+
+
+def documents_from_json(path):
+    """Flatten the nested restaurant/menu JSON into food_index documents."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    for restaurant in data:
+        for item in restaurant['menu']:
+            document = {
+                "restaurant_id": str(restaurant['id']),
+                "menu_item_id": item['id'],
+                "restaurant_name": restaurant['name'],
+                "cuisine": restaurant['cuisine'],
+                "name": item['name'],
+                "description": item.get('description') or '',
+                "price": float(item['price']),
+                "category": item['category']
+            }
+            if restaurant.get('lat') is not None and restaurant.get('lng') is not None:
+                document["location"] = {"lat": float(restaurant['lat']), "lon": float(restaurant['lng'])}
+            yield document
+
+
+def documents_from_dynamodb():
+    """Same document shape as OpenSearch_Index_From_DynamoDB.py."""
+    import boto3
+    table = boto3.resource('dynamodb', region_name=AWS_REGION).Table(DYNAMODB_TABLE_NAME)
+    scan_response = table.scan()
+    while True:
+        for item in scan_response['Items']:
+            document = {
+                "restaurant_id": item['restaurant_id'],
+                "menu_item_id": item['menu_item_id'],
+                "restaurant_name": item['restaurant_name'],
+                "cuisine": item['cuisine'],
+                "name": item['name'],
+                "description": item.get('description', ''),
+                "price": float(item['price']),
+                "category": item['category']
+            }
+            if item.get('lat') is not None and item.get('lng') is not None:
+                document["location"] = {"lat": float(item['lat']), "lon": float(item['lng'])}
+            yield document
+        if 'LastEvaluatedKey' not in scan_response:
+            break
+        scan_response = table.scan(ExclusiveStartKey=scan_response['LastEvaluatedKey'])
+
+
+if __name__ == '__main__':
+    if SOURCE == 'dynamodb':
+        print(f"Scanning {DYNAMODB_TABLE_NAME} for documents...")
+        documents = documents_from_dynamodb()
+    else:
+        try:
+            documents = list(documents_from_json(JSON_FILE_PATH))
+        except FileNotFoundError:
+            print(f"Error: {JSON_FILE_PATH} not found. Run Kaggle_dataset.py first.")
+            exit()
+
+    started = time.perf_counter()
+    index = LocalSearchIndex.build(documents)
+    elapsed = time.perf_counter() - started
+    print(f"Indexed {len(index.docs)} documents ({len(index.vocabulary)} terms) in {elapsed:.2f}s")
+
+    index.save(OUTPUT_PATH)
+    print(f"✅ Saved local index to {OUTPUT_PATH} ({os.path.getsize(OUTPUT_PATH) / 1024:.0f} KB)")
+
+    started = time.perf_counter()
+    LocalSearchIndex.load(OUTPUT_PATH)
+    print(f"Cold-start load time: {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -58,12 +58,17 @@ try:
         "mappings": {
             "properties": {
               "restaurant_id": { "type": "keyword" },  
+              "menu_item_id": { "type": "keyword" },  # Unique; tie-breaker for search_after paging
               "restaurant_name": { "type": "text" },
               "cuisine": { "type": "keyword" },
               "name": { "type": "text" },       
               "description": { "type": "text" }, 
               "price": { "type": "float" },
-              "category": { "type": "keyword" }
+              "category": { "type": "keyword" },
+              "location": { "type": "geo_point" },  # Restaurant lat/lon for "near me" search
+              # Typeahead completion fields, filled by OpenSearch_Index_From_DynamoDB.py
+              "name_suggest": { "type": "completion" },
+              "restaurant_suggest": { "type": "completion" }
             }
         }
     }
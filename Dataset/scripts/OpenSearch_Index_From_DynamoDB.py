@@ -1,6 +1,7 @@
 import boto3
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 from botocore.exceptions import ClientError
+from datetime import datetime
 import json
 
 # --- Configuration ---
@@ -32,6 +33,14 @@ client = OpenSearch(
     connection_class = RequestsHttpConnection
 )
 
+def suggest_inputs(text, max_inputs=5):
+    """
+    Completion inputs for a name: the full name plus the tail starting at each
+    later word, so typing "pizza" also completes "Margherita Pizza".
+    """
+    words = text.split()
+    return [' '.join(words[i:]) for i in range(min(len(words), max_inputs))]
+
 # 3. SCAN DynamoDB to retrieve all data
 print(f"\nScanning all items from DynamoDB table: {DYNAMODB_TABLE_NAME}...")
 scan_response = table.scan()
@@ -65,15 +74,23 @@ for item in items_to_index:
     # Create the source document (OpenSearch is flexible with extra fields)
     document = {
         "restaurant_id": item['restaurant_id'],
+        "menu_item_id": item['menu_item_id'],
         "restaurant_name": item['restaurant_name'],
         "cuisine": item['cuisine'],
         "name": item['name'],
         "description": item.get('description', ''),
         # Convert Decimal price back to float for OpenSearch
         "price": float(item['price']), 
-        "category": item['category']
+        "category": item['category'],
+        # Completion fields for the typeahead endpoint
+        "name_suggest": {"input": suggest_inputs(item['name'])},
+        "restaurant_suggest": {"input": suggest_inputs(item['restaurant_name'])}
     }
     
+    # Restaurant location for geo-distance filtering and sorting
+    if item.get('lat') is not None and item.get('lng') is not None:
+        document["location"] = {"lat": float(item['lat']), "lon": float(item['lng'])}
+    
     actions.append(index_action)
     actions.append(document)
     total_indexed_items += 1
@@ -111,5 +128,14 @@ if actions:
     except Exception as e:
         print(f"Critical error during bulk indexing: {e}")
 
+# 6. Stamp a new index generation so warm globalFoodSearch containers drop their result cache
+try:
+    client.indices.refresh(index=INDEX_NAME)
+    generation = datetime.utcnow().isoformat()
+    client.indices.put_mapping(index=INDEX_NAME, body={"_meta": {"generation": generation}})
+    print(f"✅ Index generation set to {generation}; search caches will be invalidated.")
+except Exception as e:
+    print(f"⚠️ Could not update index generation ({e}); cached search results will expire on their TTL.")
+
 print(f"\n--- Indexing Complete ---")
 print(f"Total documents prepared for indexing: {total_indexed_items}")
\ No newline at end of file
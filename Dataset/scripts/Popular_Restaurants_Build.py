@@ -0,0 +1,56 @@
+import boto3
+from datetime import datetime
+from decimal import Decimal
+
+# --- Configuration ---
+AWS_REGION = 'us-east-1'
+AGGREGATES_TABLE_NAME = 'RestaurantRatingAggregates'
+LISTS_TABLE_NAME = 'RecommendationLists'  # PK listId (String)
+LIST_ID = 'popular'
+LIST_SIZE = 50
+
+# Precomputes the popularity list getRestaurantRecommendations serves when
+# Personalize is slow, failing, or has nothing for a new user. Restaurants are
+# ranked by a Bayesian average of their ratings: with few ratings the score stays
+# close to the global mean, so one 5-star review does not top the list.
+PRIOR_WEIGHT = 10  # ratings' worth of weight given to the global mean
+
+try:
+    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    aggregates_table = dynamodb.Table(AGGREGATES_TABLE_NAME)
+    lists_table = dynamodb.Table(LISTS_TABLE_NAME)
+except Exception as e:
+    print(f"Error initializing DynamoDB: {e}")
+    print("Ensure your AWS credentials and region are correctly configured.")
+    exit()
+
+# One small item per restaurant, so a full scan is cheap
+scan_args = {'ProjectionExpression': 'restaurantId, ratingCount, ratingSum'}
+aggregates = []
+while True:
+    scan_response = aggregates_table.scan(**scan_args)
+    aggregates.extend(scan_response['Items'])
+    if 'LastEvaluatedKey' not in scan_response:
+        break
+    scan_args['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+
+rated = [a for a in aggregates if int(a.get('ratingCount', 0)) > 0]
+if not rated:
+    print("No rated restaurants found; leaving the popular list unchanged.")
+    exit()
+
+total_count = sum(int(a['ratingCount']) for a in rated)
+global_mean = sum(Decimal(a['ratingSum']) for a in rated) / total_count
+
+def score(aggregate):
+    count = int(aggregate['ratingCount'])
+    return (PRIOR_WEIGHT * global_mean + Decimal(aggregate['ratingSum'])) / (PRIOR_WEIGHT + count)
+
+ranked = sorted(rated, key=score, reverse=True)[:LIST_SIZE]
+lists_table.put_item(Item={
+    'listId': LIST_ID,
+    'restaurantIds': [a['restaurantId'] for a in ranked],
+    'generatedAt': datetime.utcnow().isoformat()
+})
+
+print(f"✅ Popular list of {len(ranked)} restaurants written to {LISTS_TABLE_NAME} (global mean {global_mean:.2f})")
@@ -0,0 +1,57 @@
+import boto3
+from collections import defaultdict
+from datetime import datetime
+
+# --- Configuration ---
+AWS_REGION = 'us-east-1'
+RATINGS_TABLE_NAME = 'Ratings'
+AGGREGATES_TABLE_NAME = 'RestaurantRatingAggregates'  # PK restaurantId (String)
+
+# Rebuilds every restaurant's rating aggregate (ratingCount, ratingSum, star1..star5)
+# from the Ratings table. createRating keeps the aggregates current from then on.
+# The aggregates are overwritten with absolute values, so run this while no ratings
+# are being submitted (or re-run it afterwards) to avoid losing concurrent updates.
+
+try:
+    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    ratings_table = dynamodb.Table(RATINGS_TABLE_NAME)
+    aggregates_table = dynamodb.Table(AGGREGATES_TABLE_NAME)
+except Exception as e:
+    print(f"Error initializing DynamoDB: {e}")
+    print("Ensure your AWS credentials and region are correctly configured.")
+    exit()
+
+print(f"\nScanning {RATINGS_TABLE_NAME} to rebuild rating aggregates...")
+
+aggregates = defaultdict(lambda: {'ratingCount': 0, 'ratingSum': 0, **{f'star{s}': 0 for s in range(1, 6)}})
+scanned = 0
+skipped = 0
+
+# Only the two attributes the aggregate needs are read
+scan_args = {
+    'ProjectionExpression': 'restaurantId, rating'
+}
+while True:
+    scan_response = ratings_table.scan(**scan_args)
+    for item in scan_response['Items']:
+        scanned += 1
+        rating = int(item.get('rating', 0))
+        if not item.get('restaurantId') or not 1 <= rating <= 5:
+            skipped += 1
+            continue
+        aggregate = aggregates[str(item['restaurantId'])]
+        aggregate['ratingCount'] += 1
+        aggregate['ratingSum'] += rating
+        aggregate[f'star{rating}'] += 1
+    if 'LastEvaluatedKey' not in scan_response:
+        break
+    scan_args['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+
+print(f"Scanned {scanned} ratings ({skipped} without a restaurant or a 1-5 rating skipped).")
+
+updated_at = datetime.utcnow().isoformat()
+with aggregates_table.batch_writer() as batch:
+    for restaurant_id, aggregate in aggregates.items():
+        batch.put_item(Item={'restaurantId': restaurant_id, 'updatedAt': updated_at, **aggregate})
+
+print(f"✅ Rating aggregates written for {len(aggregates)} restaurants in {AGGREGATES_TABLE_NAME}")
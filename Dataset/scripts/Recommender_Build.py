@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+
+# The neighbor file format ships with the recommendations Lambda
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+from localRecommender import NeighborIndex, write_neighbor_file
+
+# --- Configuration ---
+# 'json' reads table exports (JSON lines, plain or DynamoDB-typed {"Item": {...}}, or a
+# JSON array); 'dynamodb' scans the live tables
+SOURCE = 'json'
+ORDERS_EXPORT_PATH = 'restaurant_orders.jsonl'
+RATINGS_EXPORT_PATH = 'ratings.jsonl'
+AWS_REGION = 'us-east-1'
+ORDERS_TABLE_NAME = 'RestaurantOrders'
+RATINGS_TABLE_NAME = 'Ratings'
+# Deploy this file next to getRestaurantRecommendations.py (or point LOCAL_RECOMMENDER_PATH at it)
+OUTPUT_PATH = 'restaurant_neighbors.bin'
+
+TOP_K = 50             # neighbors kept per restaurant
+SHRINKAGE = 5.0        # damps similarities backed by only a few shared users
+ORDER_WEIGHT = 1.0     # each order counts once
+RATING_WEIGHT = 0.5    # per star away from a neutral 3: 5 stars adds 1.0, 1 star removes 1.0
+
+
+def read_export(path):
+    """Rows from a JSON array or JSON lines file; DynamoDB-typed export rows are deserialized."""
+    from boto3.dynamodb.types import TypeDeserializer
+    deserializer = TypeDeserializer()
+    with open(path, 'r') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        rows = json.loads(text)
+    else:
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for row in rows:
+        if isinstance(row.get('Item'), dict):
+            row = {k: deserializer.deserialize(v) for k, v in row['Item'].items()}
+        yield row
+
+
+def scan_table(table_name, attributes):
+    """Only the listed attributes, through placeholders ("timestamp" is a reserved word)."""
+    import boto3
+    table = boto3.resource('dynamodb', region_name=AWS_REGION).Table(table_name)
+    names = {f"#a{i}": attribute for i, attribute in enumerate(attributes)}
+    scan_args = {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+    while True:
+        scan_response = table.scan(**scan_args)
+        yield from scan_response['Items']
+        if 'LastEvaluatedKey' not in scan_response:
+            break
+        scan_args['ExclusiveStartKey'] = scan_response['LastEvaluatedKey']
+
+
+def load_interactions():
+    """
+    [(userId, restaurantId, timestamp, weight)] from orders and ratings.
+    Orders without a restaurant (the legacy name-only shape) are skipped.
+    """
+    if SOURCE == 'dynamodb':
+        orders = scan_table(ORDERS_TABLE_NAME, ['userId', 'restaurantId', 'timestamp'])
+        ratings = scan_table(RATINGS_TABLE_NAME, ['userId', 'restaurantId', 'rating', 'createdAt'])
+    else:
+        orders = read_export(ORDERS_EXPORT_PATH)
+        ratings = read_export(RATINGS_EXPORT_PATH) if os.path.exists(RATINGS_EXPORT_PATH) else []
+
+    interactions = []
+    for order in orders:
+        if order.get('userId') and order.get('restaurantId'):
+            interactions.append((str(order['userId']), str(order['restaurantId']),
+                                 str(order.get('timestamp', '')), ORDER_WEIGHT))
+    for rating in ratings:
+        if rating.get('userId') and rating.get('restaurantId') and rating.get('rating') is not None:
+            interactions.append((str(rating['userId']), str(rating['restaurantId']),
+                                 str(rating.get('createdAt', '')), (int(rating['rating']) - 3) * RATING_WEIGHT))
+    return interactions
+
+
+def build_matrix(interactions):
+    """
+    Sparse user x restaurant matrix of log1p(summed interaction weight). Pairs
+    whose ratings cancel out their orders (weight <= 0) are dropped.
+    Returns (matrix, user_ids, item_ids).
+    """
+    totals = defaultdict(float)
+    for user_id, restaurant_id, _, weight in interactions:
+        totals[(user_id, restaurant_id)] += weight
+    pairs = [(pair, weight) for pair, weight in totals.items() if weight > 0]
+
+    user_ids = sorted({user_id for (user_id, _), _ in pairs})
+    item_ids = sorted({restaurant_id for (_, restaurant_id), _ in pairs})
+    user_index = {user_id: u for u, user_id in enumerate(user_ids)}
+    item_index = {item_id: i for i, item_id in enumerate(item_ids)}
+
+    rows = np.fromiter((user_index[u] for (u, _), _ in pairs), dtype=np.int32, count=len(pairs))
+    cols = np.fromiter((item_index[i] for (_, i), _ in pairs), dtype=np.int32, count=len(pairs))
+    data = np.log1p(np.fromiter((w for _, w in pairs), dtype=np.float32, count=len(pairs)))
+    matrix = sp.csr_matrix((data, (rows, cols)), shape=(len(user_ids), len(item_ids)), dtype=np.float32)
+    return matrix, user_ids, item_ids
+
+
+def top_k_similarities(matrix, k=TOP_K, shrinkage=SHRINKAGE):
+    """
+    Shrunk cosine similarity between restaurant columns, then the k best
+    neighbors per restaurant. Returns dense (n_items, k) int32 neighbors
+    (-1 padded) and float32 scores, best first.
+    """
+    n_items = matrix.shape[1]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sp.diags(1.0 / norms).astype(np.float32)
+    similarity = (normalized.T @ normalized).tocsr()
+
+    if shrinkage:
+        binary = (matrix > 0).astype(np.float32)
+        co_counts = (binary.T @ binary).tocsr()
+        # Same sparsity pattern as similarity, so the data arrays line up after sorting indices
+        similarity.sort_indices()
+        co_counts.sort_indices()
+        similarity.data *= co_counts.data / (co_counts.data + shrinkage)
+
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    # Rank entries within each row in one pass: sort by (row, -score), then the
+    # position inside the row is the rank
+    row_of_entry = np.repeat(np.arange(n_items, dtype=np.int32), np.diff(similarity.indptr))
+    order = np.lexsort((similarity.indices, -similarity.data, row_of_entry))
+    rank = np.arange(order.size) - similarity.indptr[row_of_entry[order]]
+    keep = order[rank < k]
+    kept_rank = rank[rank < k]
+
+    neighbors = np.full((n_items, k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    neighbors[row_of_entry[keep], kept_rank] = similarity.indices[keep]
+    scores[row_of_entry[keep], kept_rank] = similarity.data[keep]
+    return neighbors, scores
+
+
+def write_index(path, matrix, user_ids, item_ids, neighbors, scores, k=TOP_K):
+    history = matrix.tocsr()
+    history.sort_indices()
+    write_neighbor_file(
+        path,
+        item_ids,
+        np.ascontiguousarray(neighbors, dtype='<i4'),
+        np.ascontiguousarray(scores, dtype='<f4'),
+        user_ids,
+        np.ascontiguousarray(history.indptr, dtype='<i4'),
+        np.ascontiguousarray(history.indices, dtype='<i4'),
+        np.ascontiguousarray(history.data, dtype='<f4'),
+        k
+    )
+
+
+if __name__ == '__main__':
+    try:
+        interactions = load_interactions()
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found. Export {ORDERS_TABLE_NAME} (and {RATINGS_TABLE_NAME}) first.")
+        exit()
+
+    started = time.perf_counter()
+    matrix, user_ids, item_ids = build_matrix(interactions)
+    neighbors, scores = top_k_similarities(matrix)
+    elapsed = time.perf_counter() - started
+    print(f"{len(interactions)} interactions -> {len(user_ids)} users x {len(item_ids)} restaurants "
+          f"({matrix.nnz} pairs); similarities in {elapsed:.2f}s")
+
+    write_index(OUTPUT_PATH, matrix, user_ids, item_ids, neighbors, scores)
+    print(f"✅ Saved neighbor file to {OUTPUT_PATH} ({os.path.getsize(OUTPUT_PATH) / 1024:.0f} KB)")
+
+    started = time.perf_counter()
+    NeighborIndex.load(OUTPUT_PATH)
+    print(f"Cold-start load time: {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -0,0 +1,102 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'))
+from localRecommender import NeighborIndex
+from Recommender_Build import build_matrix, load_interactions, top_k_similarities, write_index
+
+# --- Configuration ---
+# Uses the export settings of Recommender_Build.py (SOURCE, *_EXPORT_PATH)
+CUTOFFS = [5, 10, 20]
+MIN_RESTAURANTS = 2     # users need something left to recommend from after the hold-out
+BENCHMARK_USERS = 1000
+ROUNDS = 5
+
+
+def hold_out_latest(interactions):
+    """
+    Leave-one-out split: each user's most recently ordered restaurant is held
+    out, together with every order and rating they have for it, so the model
+    never sees the pair it is asked to predict.
+    """
+    latest = {}
+    restaurants = {}
+    for user_id, restaurant_id, timestamp, weight in interactions:
+        restaurants.setdefault(user_id, set()).add(restaurant_id)
+        if weight > 0 and (user_id not in latest or timestamp > latest[user_id][0]):
+            latest[user_id] = (timestamp, restaurant_id)
+
+    held_out = {
+        user_id: restaurant_id
+        for user_id, (_, restaurant_id) in latest.items()
+        if len(restaurants[user_id]) >= MIN_RESTAURANTS
+    }
+    train = [row for row in interactions if held_out.get(row[0]) != row[1]]
+    return train, held_out
+
+
+def recall_at(recommendations, held_out, k):
+    hits = sum(1 for user_id, target in held_out.items() if target in recommendations.get(user_id, [])[:k])
+    return hits / len(held_out) if held_out else 0.0
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(int(len(sorted_values) * fraction) - 1, 0)]
+
+
+if __name__ == '__main__':
+    try:
+        interactions = load_interactions()
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found. Export the orders (and ratings) tables first.")
+        exit()
+
+    train, held_out = hold_out_latest(interactions)
+    if not held_out:
+        print("🛑 No user has orders at two or more restaurants; nothing to evaluate.")
+        exit()
+
+    matrix, user_ids, item_ids = build_matrix(train)
+    neighbors, scores = top_k_similarities(matrix)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'restaurant_neighbors.bin')
+        write_index(path, matrix, user_ids, item_ids, neighbors, scores)
+
+        started = time.perf_counter()
+        index = NeighborIndex.load(path)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        # Popularity baseline: most-ordered restaurants in the training split
+        popularity = Counter(restaurant_id for _, restaurant_id, _, weight in train if weight > 0)
+        popular = [restaurant_id for restaurant_id, _ in popularity.most_common()]
+        top_n = max(CUTOFFS)
+
+        local_recs, popular_recs = {}, {}
+        for user_id in held_out:
+            local_recs[user_id] = index.recommend(user_id, top_n)
+            seen = {index.item_ids[i] for i, _ in index.history(user_id)}
+            popular_recs[user_id] = [r_id for r_id in popular if r_id not in seen][:top_n]
+
+        print(f"Leave-one-out over {len(held_out)} users "
+              f"({len(user_ids)} users x {len(item_ids)} restaurants in training)\n")
+        print(f"{'':<12}" + ''.join(f"recall@{k:<6}" for k in CUTOFFS))
+        for name, recommendations in (('item-item', local_recs), ('popular', popular_recs)):
+            print(f"{name:<12}" + ''.join(f"{recall_at(recommendations, held_out, k):<13.4f}" for k in CUTOFFS))
+
+        # Latency of the call getRestaurantRecommendations makes per request
+        sample = list(held_out)[:BENCHMARK_USERS]
+        latencies = []
+        for _ in range(ROUNDS):
+            for user_id in sample:
+                started = time.perf_counter()
+                index.recommend(user_id, 10)
+                latencies.append((time.perf_counter() - started) * 1e6)
+        latencies.sort()
+        print(f"\nload={load_ms:.1f} ms  n={len(latencies)}  p50={statistics.median(latencies):.1f} µs  "
+              f"p95={percentile(latencies, 0.95):.1f} µs  max={latencies[-1]:.1f} µs")
@@ -1,27 +1,151 @@
 import json
+import os
 import boto3
 import uuid
 from datetime import datetime
+from botocore.exceptions import ClientError
+
+RATINGS_TABLE_NAME = "Ratings"
+# One item per restaurant: ratingCount, ratingSum and a star1..star5 histogram,
+# kept in step with Ratings so listing pages never aggregate on the fly
+AGGREGATES_TABLE_NAME = os.environ.get("RATING_AGGREGATES_TABLE", "RestaurantRatingAggregates")
+# Written by processReviewPhoto (PK photoKey) when a photo finishes before its rating is saved
+PHOTO_VARIANTS_TABLE_NAME = os.environ.get("PHOTO_VARIANTS_TABLE", "ReviewPhotoVariants")
+MAX_WRITE_ATTEMPTS = 3
 
 dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table("Ratings")
+table = dynamodb.Table(RATINGS_TABLE_NAME)
+variants_table = dynamodb.Table(PHOTO_VARIANTS_TABLE_NAME)
+def aggregate_update(restaurant_id, count_delta, sum_delta, star_deltas):
+    """
+    Update action for the restaurant's aggregate. ADD creates missing
+    attributes at zero, so the first rating needs no separate initialisation.
+    """
+    values = {":count": count_delta, ":sum": sum_delta, ":now": datetime.utcnow().isoformat()}
+    actions = ["ratingCount :count", "ratingSum :sum"]
+    for star, delta in star_deltas.items():
+        values[f":s{star}"] = delta
+        actions.append(f"star{star} :s{star}")
+    return {
+        "Update": {
+            "TableName": AGGREGATES_TABLE_NAME,
+            "Key": {"restaurantId": restaurant_id},
+            "UpdateExpression": "ADD " + ", ".join(actions) + " SET updatedAt = :now",
+            "ExpressionAttributeValues": values,
+        }
+    }
+
+def save_rating(item):
+    """
+    Write the rating row and its aggregate change in one transaction. A new
+    rating adds to the aggregate; re-rating the same order swaps the old star
+    for the new one, guarded on the old value so concurrent edits retry.
+    """
+    # The resource's client serializes plain values itself, like Table.put_item
+    client = dynamodb.meta.client
+    for _ in range(MAX_WRITE_ATTEMPTS):
+        existing = table.get_item(Key={"userOrderId": item["userOrderId"]}).get("Item")
+        if existing is None:
+            put = {
+                "TableName": RATINGS_TABLE_NAME,
+                "Item": item,
+                "ConditionExpression": "attribute_not_exists(userOrderId)",
+            }
+            update = aggregate_update(item["restaurantId"], 1, item["rating"], {item["rating"]: 1})
+        else:
+            old_rating = int(existing["rating"])
+            # Variants built by processReviewPhoto belong to the photo, not the rating
+            if existing.get("photoVariants") and existing.get("photoKey") == item["photoKey"]:
+                item["photoVariants"] = existing["photoVariants"]
+            put = {
+                "TableName": RATINGS_TABLE_NAME,
+                "Item": item,
+                "ConditionExpression": "rating = :old",
+                "ExpressionAttributeValues": {":old": old_rating},
+            }
+            if 1 <= old_rating <= 5:
+                star_deltas = {old_rating: -1}
+                star_deltas[item["rating"]] = star_deltas.get(item["rating"], 0) + 1
+                update = aggregate_update(
+                    item["restaurantId"], 0, item["rating"] - old_rating,
+                    {star: delta for star, delta in star_deltas.items() if delta}
+                )
+            else:
+                # Legacy out-of-range ratings were never aggregated (see the backfill),
+                # so the new one is counted as a first rating
+                update = aggregate_update(item["restaurantId"], 1, item["rating"], {item["rating"]: 1})
+
+        try:
+            client.transact_write_items(TransactItems=[{"Put": put}, update])
+            return
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            print(f"Rating {item['userOrderId']} changed concurrently, retrying")
+    raise RuntimeError("Rating could not be saved after concurrent updates")
+
+def pending_variants(photo_key):
+    if not photo_key:
+        return None
+    item = variants_table.get_item(Key={"photoKey": photo_key}, ConsistentRead=True).get("Item")
+    return item["variants"] if item else None
+
+def attach_pending_variants(item):
+    """
+    Photo processing may finish between the lookup before the write and the
+    write itself; processReviewPhoto's own update missed the rating then, so
+    look again now that the rating exists.
+    """
+    variants = pending_variants(item["photoKey"])
+    if not variants:
+        return
+    try:
+        table.update_item(
+            Key={"userOrderId": item["userOrderId"]},
+            UpdateExpression="SET photoVariants = :variants",
+            ConditionExpression="photoKey = :key",
+            ExpressionAttributeValues={":variants": variants, ":key": item["photoKey"]},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
 
 def lambda_handler(event, context):
     body = json.loads(event["body"])
 
+    try:
+        rating = int(body["rating"])
+    except (KeyError, TypeError, ValueError):
+        rating = 0
+    if not 1 <= rating <= 5:
+        return {
+            "statusCode": 400,
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            },
+            "body": json.dumps({
+                "message": "rating must be an integer from 1 to 5"
+            })
+        }
+
     item = {
     "userOrderId": f'{body["userId"]}#{body["orderId"]}',  # REQUIRED KEY
-    "restaurantId": body["restaurantId"],
+    "restaurantId": str(body["restaurantId"]),  # String key of the aggregates table and review index
     "createdAt": datetime.utcnow().isoformat(),
     "ratingId": str(uuid.uuid4()),
     "userId": body["userId"],
     "orderId": body["orderId"],
-    "rating": int(body["rating"]),
+    "rating": rating,
     "comment": body.get("comment", ""),
     "photoKey": body.get("photoKey", "")
     }
 
-    table.put_item(Item=item)
+    variants = pending_variants(item["photoKey"])
+    if variants:
+        item["photoVariants"] = variants
+    save_rating(item)
+    if item["photoKey"] and not variants:
+        attach_pending_variants(item)
 
     return {
         "statusCode": 201,
@@ -1,41 +1,226 @@
 import json
+import math
 import boto3
 import os
 import uuid
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-s3 = boto3.client("s3")
+# SigV4 so the Content-Type and Content-Length passed to the presigners are signed
+# headers; the default SigV2 URLs in us-east-1 leave them unenforced
+s3 = boto3.client("s3", config=Config(signature_version="s3v4"))
 BUCKET = os.environ["BUCKET_NAME"]
 
-def lambda_handler(event, context):
-    # For now, fake userId (JWT later)
-    user_id = "test-user"
-
-    body = json.loads(event.get("body", "{}"))
-    order_id = body.get("orderId", "unknown")
-
-    # create unique filename
-    file_name = f"{uuid.uuid4()}.jpg"
-    object_key = f"uploads/{user_id}/{order_id}/{file_name}"
-
-    # generate pre-signed URL
-    upload_url = s3.generate_presigned_url(
-        ClientMethod="put_object",
-        Params={
-            "Bucket": BUCKET,
-            "Key": object_key,
-            "ContentType": "image/png"
-        },
-        ExpiresIn=300  # 5 minutes
-    )
+# Every upload is bounded at S3: small files get a presigned POST policy with a
+# content-length-range and a fixed Content-Type, large ones a multipart upload whose
+# part URLs are each signed for an exact Content-Length. Oversized or mislabelled
+# uploads are rejected by S3 and never reach processReviewPhoto.
+ALLOWED_CONTENT_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/avif": "avif",
+}
+DEFAULT_CONTENT_TYPE = "image/jpeg"
+# The single-file PUT URL has always been signed for image/png; clients that send no
+# contentType keep getting exactly that
+LEGACY_CONTENT_TYPE = "image/png"
+MAX_FILES_PER_REQUEST = 10
+MAX_POST_BYTES = 10 * 1024 * 1024          # single-request POST limit
+MAX_MULTIPART_BYTES = 50 * 1024 * 1024
+MULTIPART_PART_BYTES = 5 * 1024 * 1024     # S3's minimum part size (except the last part)
+POST_EXPIRES_SECONDS = 300                 # 5 minutes
+PART_EXPIRES_SECONDS = 3600                # slow mobile links need longer for many parts
 
+def response(status_code, body):
     return {
-        "statusCode": 200,
+        "statusCode": status_code,
         "headers": {
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "*"
         },
-        "body": json.dumps({
-            "uploadUrl": upload_url,
-            "photoKey": object_key
+        "body": json.dumps(body)
+    }
+
+def authenticated_user_id(event):
+    """
+    The caller's id from the API Gateway authorizer: Cognito claims (REST or HTTP
+    API JWT) or a Lambda authorizer's principalId. None when unauthenticated.
+    """
+    authorizer = (event.get("requestContext") or {}).get("authorizer") or {}
+    claims = authorizer.get("claims") or (authorizer.get("jwt") or {}).get("claims") or {}
+    return claims.get("sub") or authorizer.get("principalId") or (authorizer.get("lambda") or {}).get("userId")
+
+def parse_file(spec, default_content_type=DEFAULT_CONTENT_TYPE):
+    """{"contentType": ..., "size": bytes} -> (content_type, size). size is optional for POST uploads."""
+    content_type = spec.get("contentType", default_content_type)
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise ValueError(f"Unsupported contentType: {content_type}")
+    size = spec.get("size")
+    if size is not None:
+        # bool is an int subclass: {"size": true} would be signed for 1 byte
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise ValueError("size must be a positive integer")
+        if size > MAX_MULTIPART_BYTES:
+            raise ValueError(f"Files are limited to {MAX_MULTIPART_BYTES} bytes")
+    return content_type, size
+
+def new_object_key(user_id, order_id, content_type):
+    return f"uploads/{user_id}/{order_id}/{uuid.uuid4()}.{ALLOWED_CONTENT_TYPES[content_type]}"
+
+def presign_post(object_key, content_type):
+    post = s3.generate_presigned_post(
+        Bucket=BUCKET,
+        Key=object_key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, MAX_POST_BYTES],
+        ],
+        ExpiresIn=POST_EXPIRES_SECONDS
+    )
+    return {
+        "photoKey": object_key,
+        "method": "POST",
+        "url": post["url"],
+        "fields": post["fields"],
+        "maxBytes": MAX_POST_BYTES
+    }
+
+def presign_multipart(object_key, content_type, size):
+    """Start a multipart upload and presign one PUT per part, each pinned to its exact length."""
+    upload_id = s3.create_multipart_upload(
+        Bucket=BUCKET,
+        Key=object_key,
+        ContentType=content_type
+    )["UploadId"]
+
+    part_count = math.ceil(size / MULTIPART_PART_BYTES)
+    parts = []
+    for part_number in range(1, part_count + 1):
+        part_bytes = min(MULTIPART_PART_BYTES, size - (part_number - 1) * MULTIPART_PART_BYTES)
+        parts.append({
+            "partNumber": part_number,
+            "size": part_bytes,
+            "url": s3.generate_presigned_url(
+                ClientMethod="upload_part",
+                Params={
+                    "Bucket": BUCKET,
+                    "Key": object_key,
+                    "UploadId": upload_id,
+                    "PartNumber": part_number,
+                    "ContentLength": part_bytes
+                },
+                ExpiresIn=PART_EXPIRES_SECONDS
+            )
         })
+
+    return {
+        "photoKey": object_key,
+        "method": "MULTIPART",
+        "uploadId": upload_id,
+        "partSize": MULTIPART_PART_BYTES,
+        "parts": parts
     }
+
+def presign_put(object_key, content_type, size):
+    """The original single-file contract: PUT the bytes to the URL with this Content-Type."""
+    params = {"Bucket": BUCKET, "Key": object_key, "ContentType": content_type}
+    if size is not None:
+        params["ContentLength"] = size
+    return s3.generate_presigned_url(
+        ClientMethod="put_object",
+        Params=params,
+        ExpiresIn=POST_EXPIRES_SECONDS
+    )
+
+def presign_file(user_id, order_id, spec):
+    content_type, size = parse_file(spec)
+    object_key = new_object_key(user_id, order_id, content_type)
+    if size is not None and size > MAX_POST_BYTES:
+        return presign_multipart(object_key, content_type, size)
+    return presign_post(object_key, content_type)
+
+def owned_upload_key(body, user_id):
+    """Multipart complete/abort may only touch this user's own upload prefix."""
+    object_key = body.get("photoKey") or ""
+    if not object_key.startswith(f"uploads/{user_id}/") or not body.get("uploadId"):
+        raise ValueError("photoKey and uploadId of your own upload are required")
+    return object_key
+
+def s3_error_response(e):
+    """NoSuchUpload, InvalidPart, EntityTooSmall, ... are the caller's to fix, not a server error."""
+    error = e.response.get("Error", {})
+    status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 400)
+    return response(status if 400 <= status < 500 else 400, {
+        "message": error.get("Message", str(e)),
+        "code": error.get("Code")
+    })
+
+def complete_multipart(body, user_id):
+    object_key = owned_upload_key(body, user_id)
+    parts = body.get("parts") or []
+    if not parts or len(parts) > math.ceil(MAX_MULTIPART_BYTES / MULTIPART_PART_BYTES):
+        raise ValueError("parts must list the uploaded parts")
+    s3.complete_multipart_upload(
+        Bucket=BUCKET,
+        Key=object_key,
+        UploadId=body["uploadId"],
+        MultipartUpload={
+            "Parts": sorted(
+                ({"PartNumber": int(p["partNumber"]), "ETag": p["etag"]} for p in parts),
+                key=lambda p: p["PartNumber"]
+            )
+        }
+    )
+    return {"photoKey": object_key}
+
+def abort_multipart(body, user_id):
+    object_key = owned_upload_key(body, user_id)
+    s3.abort_multipart_upload(Bucket=BUCKET, Key=object_key, UploadId=body["uploadId"])
+    return {"photoKey": object_key, "aborted": True}
+
+def lambda_handler(event, context):
+    # The key path carries the caller's id: complete/abort are limited to that prefix
+    user_id = authenticated_user_id(event)
+    if not user_id:
+        return response(401, {"message": "Unauthorized"})
+
+    body = json.loads(event.get("body") or "{}")
+    order_id = body.get("orderId", "unknown")
+    action = body.get("action", "presign")
+
+    try:
+        if action == "complete":
+            return response(200, complete_multipart(body, user_id))
+        if action == "abort":
+            return response(200, abort_multipart(body, user_id))
+        if action != "presign":
+            return response(400, {"message": f"Unknown action: {action}"})
+
+        # Batch mode: {"files": [{"contentType": "image/jpeg", "size": 2400000}, ...]}
+        if "files" in body:
+            files = body["files"]
+            if not isinstance(files, list) or not files or len(files) > MAX_FILES_PER_REQUEST:
+                return response(400, {"message": f"files must list 1 to {MAX_FILES_PER_REQUEST} uploads"})
+            return response(200, {"uploads": [presign_file(user_id, order_id, spec) for spec in files]})
+
+        # Single upload: PUT to uploadUrl as before (pinned to size when given), or POST
+        # as multipart/form-data to post.url with post.fields for a size-bounded upload
+        content_type, size = parse_file(body, LEGACY_CONTENT_TYPE)
+        if size is not None and size > MAX_POST_BYTES:
+            return response(200, presign_multipart(new_object_key(user_id, order_id, content_type), content_type, size))
+        upload = presign_post(new_object_key(user_id, order_id, content_type), content_type)
+        return response(200, {
+            "uploadUrl": presign_put(upload["photoKey"], content_type, size),
+            "photoKey": upload["photoKey"],
+            "post": {
+                "url": upload["url"],
+                "fields": upload["fields"],
+                "maxBytes": upload["maxBytes"]
+            }
+        })
+    except ClientError as e:
+        return s3_error_response(e)
+    except (ValueError, KeyError, TypeError) as e:
+        return response(400, {"message": str(e)})
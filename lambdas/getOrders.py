@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+import os
+import boto3
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+# --- Configuration ---
+TABLE_NAME = "RestaurantOrders"
+# GSI on RestaurantOrders: partition key userId, sort key timestamp (ISO-8601, so it sorts by time)
+USER_ORDERS_INDEX = os.environ.get("USER_ORDERS_INDEX", "UserOrdersIndex")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Table and index keys; always returned so every order stays addressable and cursors stay valid
+KEY_FIELDS = ("orderId", "userId", "timestamp")
+PROJECTABLE_FIELDS = {
+    "restaurantId",
+    "status",
+    "amount",
+    "paymentId",
+    "items",
+}
+# List views get the summary; ask for fields=...,items to pull the full item arrays
+DEFAULT_FIELDS = list(KEY_FIELDS) + ["restaurantId", "status", "amount"]
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(TABLE_NAME)
+
+# --- Helpers ---
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+        },
+        "body": json.dumps(body, cls=DecimalEncoder),
+    }
+
+def parse_fields(raw_fields):
+    if not raw_fields:
+        return DEFAULT_FIELDS
+    fields = list(KEY_FIELDS)
+    for field in raw_fields.split(","):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in PROJECTABLE_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        fields.append(field)
+    return fields
+
+def projection_args(fields):
+    """Every field goes through a placeholder: timestamp and status are DynamoDB reserved words."""
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+def parse_limit(raw_limit):
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(last_evaluated_key):
+    """Opaque, URL-safe cursor wrapping DynamoDB's LastEvaluatedKey."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, cls=DecimalEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor, user_id):
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or key.get("userId") != user_id:
+        raise ValueError("Invalid cursor")
+    return key
+
+def query_orders_page(user_id, limit, cursor=None, fields=DEFAULT_FIELDS):
+    """
+    One page of a user's orders, newest first, straight off the index (no scan).
+    Returns (orders, next_cursor).
+    """
+    query_args = {
+        "IndexName": USER_ORDERS_INDEX,
+        "KeyConditionExpression": Key("userId").eq(user_id),
+        "ScanIndexForward": False,
+        "Limit": limit,
+        **projection_args(fields),
+    }
+    start_key = decode_cursor(cursor, user_id)
+    if start_key is not None:
+        query_args["ExclusiveStartKey"] = start_key
+
+    response = table.query(**query_args)
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"))
+
+# --- Lambda Handler ---
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    path_params = event.get("pathParameters") or {}
+    user_id = path_params.get("userId") or query_params.get("userId")
+
+    if not user_id:
+        return respond(400, {"message": "Missing userId query parameter"})
+
+    try:
+        fields = parse_fields(query_params.get("fields"))
+        limit = parse_limit(query_params.get("limit"))
+        orders, next_cursor = query_orders_page(user_id, limit, query_params.get("cursor"), fields)
+    except ValueError as e:
+        return respond(400, {"message": str(e)})
+    except Exception as e:
+        print("ERROR:", str(e))
+        return respond(500, {"error": str(e)})
+
+    print(f"Fetched {len(orders)} orders for {user_id}")
+    return respond(200, {
+        "userId": user_id,
+        "count": len(orders),
+        "orders": orders,
+        "nextCursor": next_cursor,
+    })
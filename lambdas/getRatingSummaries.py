@@ -0,0 +1,86 @@
+import json
+import os
+import random
+import time
+import boto3
+from decimal import Decimal
+
+# --- Configuration ---
+# Maintained by createRating; see Dataset/scripts/Rating_Aggregates_Backfill.py for existing rows
+AGGREGATES_TABLE_NAME = os.environ.get("RATING_AGGREGATES_TABLE", "RestaurantRatingAggregates")
+MAX_IDS = 100  # BatchGetItem limit
+STARS = (1, 2, 3, 4, 5)
+MAX_BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BASE_DELAY_SECONDS = 0.05
+
+dynamodb = boto3.resource("dynamodb")
+
+# --- Helpers ---
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+        },
+        "body": json.dumps(body),
+    }
+
+def parse_ids(raw_ids):
+    """Split a comma-separated id list, keeping order and dropping duplicates and blanks."""
+    return list(dict.fromkeys(part.strip() for part in raw_ids.split(",") if part.strip()))
+
+def summarize(aggregate):
+    count = int(aggregate.get("ratingCount", 0))
+    total = Decimal(aggregate.get("ratingSum", 0))
+    return {
+        "count": count,
+        "average": round(float(total / count), 2) if count else None,
+        "histogram": {str(star): int(aggregate.get(f"star{star}", 0)) for star in STARS},
+    }
+
+def read_aggregates(restaurant_ids):
+    """
+    One BatchGetItem for every requested restaurant, retrying UnprocessedKeys
+    with exponential backoff and full jitter.
+    """
+    request = {
+        AGGREGATES_TABLE_NAME: {
+            "Keys": [{"restaurantId": restaurant_id} for restaurant_id in restaurant_ids]
+        }
+    }
+    aggregates = {}
+    for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY_SECONDS * (2 ** attempt)))
+        response = dynamodb.batch_get_item(RequestItems=request)
+        for item in response.get("Responses", {}).get(AGGREGATES_TABLE_NAME, []):
+            aggregates[item["restaurantId"]] = item
+        request = response.get("UnprocessedKeys")
+        if not request:
+            return aggregates
+    raise RuntimeError("Rating aggregates were not processed after retries")
+
+# --- Lambda Handler ---
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    restaurant_ids = parse_ids(query_params.get("ids") or "")
+
+    if not restaurant_ids:
+        return respond(400, {"message": "Missing ids query parameter"})
+    if len(restaurant_ids) > MAX_IDS:
+        return respond(400, {"message": f"At most {MAX_IDS} ids per request"})
+
+    try:
+        aggregates = read_aggregates(restaurant_ids)
+    except Exception as e:
+        print("ERROR:", str(e))
+        return respond(500, {"error": str(e)})
+
+    # Restaurants nobody has rated yet still get an (empty) summary
+    return respond(200, {
+        "summaries": {
+            restaurant_id: summarize(aggregates.get(restaurant_id, {}))
+            for restaurant_id in restaurant_ids
+        }
+    })
@@ -1,5 +1,13 @@
+import base64
+import binascii
+import hashlib
 import json
+import os
+import threading
+import time
 import boto3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
@@ -9,6 +17,37 @@ TABLE_NAME = "RestaurantMenu"
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(TABLE_NAME)
 
+# Batch mode (GET /menu?ids=1,2,3)
+MAX_BATCH_IDS = 25
+BATCH_WORKERS = 8
+
+# Warm-container menu cache. Writers bump RestaurantMenuVersions.version
+# (keyed by restaurant_id) whenever a menu changes, and cached entries are
+# re-validated against it at most every MENU_VERSION_CHECK_SECONDS.
+VERSION_TABLE_NAME = os.environ.get("MENU_VERSION_TABLE", "RestaurantMenuVersions")
+CACHE_MAX_ENTRIES = int(os.environ.get("MENU_CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL_SECONDS = float(os.environ.get("MENU_CACHE_TTL_SECONDS", "300"))
+VERSION_CHECK_SECONDS = float(os.environ.get("MENU_VERSION_CHECK_SECONDS", "5"))
+version_table = dynamodb.Table(VERSION_TABLE_NAME)
+
+# Full-menu responses carry an ETag and may be cached by CloudFront/browsers
+MENU_CACHE_CONTROL = os.environ.get(
+    "MENU_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300"
+)
+
+# Paginated mode (?limit=50&cursor=...) and field projection (?fields=name,price)
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+KEY_FIELDS = ("restaurant_id", "menu_item_id")
+PROJECTABLE_FIELDS = {
+    "restaurant_id", "menu_item_id", "restaurant_name", "cuisine",
+    "name", "description", "price", "category",
+}
+
+# Category mode (?category=Pizza), served by the CategoryIndex GSI
+# (partition key "category", sort key "restaurant_id", all attributes projected)
+CATEGORY_INDEX_NAME = os.environ.get("MENU_CATEGORY_INDEX", "CategoryIndex")
+
 # Allowed frontend origins
 ALLOWED_ORIGINS = {
     "http://localhost:5173",
@@ -33,21 +72,403 @@ def cors_headers(event):
     return {
         "Access-Control-Allow-Origin": allow_origin,
         "Access-Control-Allow-Methods": "GET,OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization",
+        "Access-Control-Allow-Headers": "Content-Type,Authorization,If-None-Match",
+        "Access-Control-Expose-Headers": "ETag,X-Cache",
         "Content-Type": "application/json",
+        # Allow-Origin is reflected per request, so shared caches must key on Origin
+        "Vary": "Origin",
     }
 
 def respond(event, status_code, body):
+    return respond_raw(event, status_code, json.dumps(body, cls=DecimalEncoder))
+
+def respond_raw(event, status_code, body, extra_headers=None):
+    """Like respond(), for bodies that are already serialized JSON."""
+    headers = cors_headers(event)
+    if extra_headers:
+        headers.update(extra_headers)
     return {
         "statusCode": status_code,
-        "headers": cors_headers(event),
-        "body": json.dumps(body, cls=DecimalEncoder),
+        "headers": headers,
+        "body": body,
+    }
+
+def request_header(event, name):
+    """Case-insensitive header lookup (HTTP APIs lowercase header names, REST APIs don't)."""
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def make_etag(payload):
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+    return "*" in candidates or etag in candidates
+
+def not_modified(event, etag):
+    return respond_raw(event, 304, "", {"ETag": etag, "Cache-Control": MENU_CACHE_CONTROL})
+
+def parse_ids(raw_ids):
+    """Split "1, 2,2,3" into ["1", "2", "3"], keeping first-seen order."""
+    ids = []
+    for part in raw_ids.split(","):
+        part = part.strip()
+        if part and part not in ids:
+            ids.append(part)
+    return ids
+
+# --- Menu Cache ---
+class CacheEntry:
+    """
+    A cached menu together with its serialized JSON body and ETag, computed
+    once at load time so cache hits and 304s never re-run DecimalEncoder.
+    """
+    __slots__ = ("items", "body", "etag", "version", "loaded_at", "checked_at")
+
+    def __init__(self, items, version, now):
+        self.items = items
+        self.body = json.dumps(items, cls=DecimalEncoder)
+        self.etag = make_etag(self.body)
+        self.version = version
+        self.loaded_at = now
+        self.checked_at = now
+
+    def projection_etag(self, fields):
+        # Projections are deterministic functions of the full body
+        return make_etag(self.etag + "|" + ",".join(fields))
+
+class MenuCache:
+    """
+    LRU cache of menu items with a TTL. It lives at module scope so it
+    survives across warm invocations; the lock makes it safe to share with
+    the batch-mode worker threads.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, now):
+        """Return the live entry for key (refreshing its LRU position) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now - entry.loaded_at >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+menu_cache = MenuCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+# --- Pagination & Projection ---
+def parse_fields(raw_fields):
+    """
+    Turn "name,price" into the attributes to return. The table keys are
+    always included so items stay addressable and cursors stay valid.
+    """
+    fields = list(KEY_FIELDS)
+    for field in raw_fields.split(","):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in PROJECTABLE_FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        fields.append(field)
+    return fields
+
+def projection_args(fields):
+    """
+    ProjectionExpression kwargs for a query. "name" is a DynamoDB reserved
+    word, so every field goes through a placeholder.
+    """
+    if not fields:
+        return {}
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
     }
 
+def project_items(items, fields):
+    if not fields:
+        return items
+    return [{f: item[f] for f in fields if f in item} for item in items]
+
+def parse_limit(raw_limit):
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(last_evaluated_key, mode):
+    """
+    Opaque, URL-safe cursor wrapping DynamoDB's LastEvaluatedKey. mode (the
+    table or index queried) is carried along: a category cursor's key has an
+    extra "category" attribute that the table query would reject.
+    """
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps({"mode": mode, "key": last_evaluated_key}, cls=DecimalEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor, mode):
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict) or not isinstance(payload.get("key"), dict):
+        raise ValueError("Invalid cursor")
+    if payload.get("mode") != mode:
+        raise ValueError("Cursor does not belong to this query")
+    return payload["key"]
+
+# boto3 resources are not thread-safe, so each batch worker builds its own
+# once. The pool lives at module scope, so warm invocations reuse the worker
+# threads and the tables they already hold.
+_thread_local = threading.local()
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+
+def thread_tables():
+    if not hasattr(_thread_local, "table"):
+        session = boto3.session.Session()
+        resource = session.resource("dynamodb")
+        _thread_local.table = resource.Table(TABLE_NAME)
+        _thread_local.version_table = resource.Table(VERSION_TABLE_NAME)
+    return _thread_local.table, _thread_local.version_table
+
+def query_menu(restaurant_id, menu_table=None):
+    """Every item in the restaurant's partition, following LastEvaluatedKey past the 1 MB limit."""
+    query_args = {"KeyConditionExpression": Key("restaurant_id").eq(str(restaurant_id))}
+    response = (menu_table or table).query(**query_args)
+    items = response.get("Items", [])
+
+    while "LastEvaluatedKey" in response:
+        response = (menu_table or table).query(
+            ExclusiveStartKey=response["LastEvaluatedKey"], **query_args
+        )
+        items.extend(response.get("Items", []))
+    return items
+
+def query_page(key_condition, scope, limit, cursor=None, fields=None, index_name=None):
+    """
+    One page of a query. scope holds the key values the query is pinned to;
+    a cursor issued for a different scope is rejected. Returns (items, next_cursor).
+    """
+    mode = index_name or TABLE_NAME
+    start_key = decode_cursor(cursor, mode)
+    if start_key is not None and any(start_key.get(k) != v for k, v in scope.items()):
+        raise ValueError("Cursor does not belong to this query")
+
+    query_args = {
+        "KeyConditionExpression": key_condition,
+        "Limit": limit,
+        **projection_args(fields),
+    }
+    if index_name:
+        query_args["IndexName"] = index_name
+    if start_key is not None:
+        query_args["ExclusiveStartKey"] = start_key
+
+    response = table.query(**query_args)
+    return response.get("Items", []), encode_cursor(response.get("LastEvaluatedKey"), mode)
+
+def query_menu_page(restaurant_id, limit, cursor=None, fields=None):
+    """One page of a restaurant's menu."""
+    restaurant_id = str(restaurant_id)
+    return query_page(
+        Key("restaurant_id").eq(restaurant_id),
+        {"restaurant_id": restaurant_id},
+        limit, cursor, fields,
+    )
+
+def query_category_page(category, restaurant_id, limit, cursor=None, fields=None):
+    """
+    One page of items in a category from the CategoryIndex GSI, either
+    across all restaurants or narrowed to one via the index sort key.
+    """
+    key_condition = Key("category").eq(category)
+    scope = {"category": category}
+    if restaurant_id:
+        key_condition = key_condition & Key("restaurant_id").eq(str(restaurant_id))
+        scope["restaurant_id"] = str(restaurant_id)
+    return query_page(key_condition, scope, limit, cursor, fields, CATEGORY_INDEX_NAME)
+
+VERSION_UNKNOWN = object()
+
+def read_menu_version(restaurant_id, versions=None):
+    """
+    Current menu version for a restaurant (0 if it was never bumped), or
+    VERSION_UNKNOWN when the version table can't be read, in which case
+    cached entries fall back to plain TTL expiry.
+    """
+    try:
+        response = (versions or version_table).get_item(
+            Key={"restaurant_id": str(restaurant_id)},
+            ProjectionExpression="version",
+        )
+    except Exception as e:
+        print(f"Menu version lookup failed for {restaurant_id}:", str(e))
+        return VERSION_UNKNOWN
+    return response.get("Item", {}).get("version", 0)
+
+def peek_menu(restaurant_id, now):
+    """
+    The cached entry if it can be served as is (live and version-checked
+    recently), else None. Never touches DynamoDB.
+    """
+    entry = menu_cache.get(str(restaurant_id), now)
+    if entry is None or now - entry.checked_at >= VERSION_CHECK_SECONDS:
+        return None
+    menu_cache.record(hit=True)
+    return entry
+
+def get_menu(restaurant_id, menu_table=None, versions=None):
+    """
+    A restaurant's menu as a CacheEntry (None if it has no items), served
+    from the warm-container cache when possible. Returns (entry, cache_hit).
+    """
+    key = str(restaurant_id)
+    now = time.time()
+
+    entry = menu_cache.get(key, now)
+    if entry is not None and now - entry.checked_at >= VERSION_CHECK_SECONDS:
+        version = read_menu_version(key, versions)
+        if version is not VERSION_UNKNOWN and version != entry.version:
+            menu_cache.invalidate(key)
+            entry = None
+        else:
+            entry.checked_at = now
+
+    if entry is not None:
+        menu_cache.record(hit=True)
+        return entry, True
+
+    menu_cache.record(hit=False)
+    # Read the version before the items so a concurrent update leaves us
+    # holding an older version, which the next check then invalidates.
+    version = read_menu_version(key, versions)
+    items = query_menu(key, menu_table)
+    if not items:
+        return None, False
+    entry = CacheEntry(items, version, now)
+    menu_cache.put(key, entry)
+    return entry, False
+
+def fetch_menu_result(restaurant_id):
+    """
+    Fetch one restaurant's menu for batch mode as (status_code, payload).
+    On success the payload is the entry's pre-serialized JSON body.
+    """
+    try:
+        menu_table, versions = thread_tables()
+        entry, _ = get_menu(restaurant_id, menu_table, versions)
+    except ClientError as e:
+        print(f"DynamoDB Client Error for {restaurant_id}:", e.response["Error"]["Message"])
+        return 500, {"error": "DynamoDB query failed"}
+    except Exception as e:
+        print(f"Unexpected error for {restaurant_id}:", str(e))
+        return 500, {"error": "An unexpected error occurred"}
+
+    if entry is None:
+        return 404, {"error": f"Restaurant menu not found for ID: {restaurant_id}"}
+    return 200, entry.body
+
+def batch_menus(event, restaurant_ids):
+    """
+    Fetch several menus in one invocation. Each restaurant is its own
+    partition, so the queries run concurrently and the results are keyed by
+    restaurantId. Failures are reported per restaurant under "errors" so one
+    missing menu doesn't fail the whole page.
+    """
+    if len(restaurant_ids) > MAX_BATCH_IDS:
+        return respond(event, 400, {"error": f"At most {MAX_BATCH_IDS} ids per request"})
+
+    # Cache hits are answered here; only the rest go to the worker pool
+    now = time.time()
+    results = {}
+    for restaurant_id in restaurant_ids:
+        entry = peek_menu(restaurant_id, now)
+        if entry is not None:
+            results[restaurant_id] = (200, entry.body)
+    misses = [r_id for r_id in restaurant_ids if r_id not in results]
+    if misses:
+        results.update(zip(misses, batch_pool.map(fetch_menu_result, misses)))
+
+    # Splice the cached menu bodies in rather than re-serializing them
+    menus = []
+    errors = {}
+    for restaurant_id in restaurant_ids:
+        status_code, payload = results[restaurant_id]
+        if status_code == 200:
+            menus.append(f"{json.dumps(restaurant_id)}:{payload}")
+        else:
+            errors[restaurant_id] = {"statusCode": status_code, **payload}
+
+    body = '{"menus":{' + ",".join(menus) + '},"errors":' + json.dumps(errors) + "}"
+    return respond_raw(event, 200, body)
+
 # --- Lambda Handler ---
 def lambda_handler(event, context):
     print("Received event:", json.dumps(event))
+    response = handle_request(event)
+    print("Menu cache stats:", json.dumps(menu_cache.stats()))
+    return response
 
+def handle_request(event):
     # Handle CORS preflight
     method = event.get("httpMethod")
     if method == "OPTIONS":
@@ -57,27 +478,73 @@ def lambda_handler(event, context):
             "body": "",
         }
 
-    # Extract restaurantId
+    # Extract restaurantId, or a list of ids for batch mode
     path_params = event.get("pathParameters") or {}
+    query_params = event.get("queryStringParameters") or {}
     restaurant_id = path_params.get("restaurantId")
 
-    if not restaurant_id:
+    if not restaurant_id and query_params.get("ids"):
+        restaurant_ids = parse_ids(query_params["ids"])
+        if restaurant_ids:
+            return batch_menus(event, restaurant_ids)
+
+    category = query_params.get("category")
+    if not restaurant_id and not category:
         return respond(event, 400, {"error": "Missing restaurantId in path parameters"})
 
     try:
-        response = table.query(
-            KeyConditionExpression=Key("restaurant_id").eq(str(restaurant_id))
-        )
+        fields = parse_fields(query_params["fields"]) if query_params.get("fields") else None
+
+        # Category mode: /menu/{restaurantId}?category=Pizza or /menu?category=Desserts
+        if category:
+            limit = parse_limit(query_params.get("limit"))
+            items, next_cursor = query_category_page(
+                category, restaurant_id, limit, query_params.get("cursor"), fields
+            )
+            return respond(event, 200, {
+                "category": category,
+                "items": items,
+                "nextCursor": next_cursor,
+            })
 
-        items = response.get("Items", [])
-        if not items:
+        # Paginated mode goes straight to DynamoDB one page at a time
+        if "limit" in query_params or "cursor" in query_params:
+            limit = parse_limit(query_params.get("limit"))
+            items, next_cursor = query_menu_page(
+                restaurant_id, limit, query_params.get("cursor"), fields
+            )
+            if not items and not query_params.get("cursor"):
+                return respond(
+                    event,
+                    404,
+                    {"error": f"Restaurant menu not found for ID: {restaurant_id}"},
+                )
+            return respond(event, 200, {"items": items, "nextCursor": next_cursor})
+
+        entry, cache_hit = get_menu(restaurant_id)
+        if entry is None:
             return respond(
                 event,
                 404,
                 {"error": f"Restaurant menu not found for ID: {restaurant_id}"},
             )
 
-        return respond(event, 200, items)
+        etag = entry.projection_etag(fields) if fields else entry.etag
+        if etag_matches(request_header(event, "If-None-Match"), etag):
+            return not_modified(event, etag)
+
+        if fields:
+            body = json.dumps(project_items(entry.items, fields), cls=DecimalEncoder)
+        else:
+            body = entry.body
+        return respond_raw(event, 200, body, {
+            "ETag": etag,
+            "Cache-Control": MENU_CACHE_CONTROL,
+            "X-Cache": "HIT" if cache_hit else "MISS",
+        })
+
+    except ValueError as e:
+        return respond(event, 400, {"error": str(e)})
 
     except ClientError as e:
         print("DynamoDB Client Error:", e.response["Error"]["Message"])
@@ -0,0 +1,167 @@
+import base64
+import binascii
+import heapq
+import json
+import os
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+# --- Configuration ---
+TABLE_NAME = "RestaurantOrders"
+# Sparse GSI: partition key restaurantShard ("<restaurantId>#<n>"), sort key timestamp.
+# orderService writes the shard key on new orders, orderStreamProcessor removes it once
+# an order is DELIVERED or CANCELLED, so the index only ever holds open orders.
+FEED_INDEX_NAME = os.environ.get("RESTAURANT_FEED_INDEX", "RestaurantFeedIndex")
+# Must match RESTAURANT_FEED_SHARDS in orderService
+RESTAURANT_FEED_SHARDS = int(os.environ.get("RESTAURANT_FEED_SHARDS", "8"))
+
+DEFAULT_FEED_SIZE = 100
+MAX_FEED_SIZE = 500
+# "since" cursors re-read this much history so orders that land late in the GSI
+# (eventual consistency, clock skew between writers) are not skipped
+SINCE_OVERLAP_SECONDS = float(os.environ.get("FEED_SINCE_OVERLAP_SECONDS", "5"))
+
+FEED_FIELDS = ("orderId", "restaurantShard", "timestamp", "status", "items", "amount", "userId")
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(TABLE_NAME)
+
+# Shard queries go through the resource's client, which (unlike the resource
+# itself) is thread-safe, on a pool that lives across warm invocations
+shard_pool = ThreadPoolExecutor(max_workers=RESTAURANT_FEED_SHARDS)
+
+# --- Helpers ---
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+def respond(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+        },
+        "body": json.dumps(body, cls=DecimalEncoder),
+    }
+
+def parse_limit(raw_limit):
+    if raw_limit is None:
+        return DEFAULT_FEED_SIZE
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_FEED_SIZE)
+
+def encode_since(restaurant_id, watermark, seen):
+    """
+    Opaque "since" cursor: everything at or after watermark is re-queried,
+    and seen (orderId -> timestamp) filters out what the client already has.
+    """
+    raw = json.dumps({"r": restaurant_id, "ts": watermark, "seen": seen}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_since(cursor, restaurant_id):
+    if not cursor:
+        return None, {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict) or state.get("r") != restaurant_id or not isinstance(state.get("ts"), str):
+        raise ValueError("Invalid cursor")
+    return state["ts"], state.get("seen") or {}
+
+def next_since(restaurant_id, orders, watermark, seen):
+    """Advance the cursor past the orders just returned, keeping only the overlap window's ids."""
+    if not orders:
+        if not watermark:
+            watermark = (datetime.utcnow() - timedelta(seconds=SINCE_OVERLAP_SECONDS)).isoformat()
+        return encode_since(restaurant_id, watermark, seen)
+    newest = orders[-1]["timestamp"]
+    new_watermark = (datetime.fromisoformat(newest) - timedelta(seconds=SINCE_OVERLAP_SECONDS)).isoformat()
+    if watermark and watermark > new_watermark:
+        new_watermark = watermark
+    window = {order_id: ts for order_id, ts in seen.items() if ts >= new_watermark}
+    window.update({o["orderId"]: o["timestamp"] for o in orders if o["timestamp"] >= new_watermark})
+    return encode_since(restaurant_id, new_watermark, window)
+
+def query_shard(shard_key, since, limit):
+    """Oldest-first open orders in one shard, at most limit of them."""
+    key_condition = Key("restaurantShard").eq(shard_key)
+    if since:
+        key_condition = key_condition & Key("timestamp").gte(since)
+    names = {f"#f{i}": field for i, field in enumerate(FEED_FIELDS)}
+    query_args = {
+        "TableName": TABLE_NAME,
+        "IndexName": FEED_INDEX_NAME,
+        "KeyConditionExpression": key_condition,
+        "ScanIndexForward": True,
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+    items = []
+    while len(items) < limit:
+        response = dynamodb.meta.client.query(Limit=limit - len(items), **query_args)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        query_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return items
+
+def read_feed(restaurant_id, limit, since=None, seen=None):
+    """
+    Query every shard in parallel and k-way merge by timestamp. Each shard
+    returns its oldest `limit` orders, which always covers the merged oldest `limit`.
+    """
+    seen = seen or {}
+    shard_keys = [f"{restaurant_id}#{n}" for n in range(RESTAURANT_FEED_SHARDS)]
+    shards = list(shard_pool.map(lambda key: query_shard(key, since, limit + len(seen)), shard_keys))
+
+    merged = heapq.merge(*shards, key=lambda order: (order["timestamp"], order["orderId"]))
+    orders = []
+    for order in merged:
+        if order["orderId"] in seen:
+            continue
+        order.pop("restaurantShard", None)
+        orders.append(order)
+        if len(orders) == limit:
+            break
+    return orders
+
+# --- Lambda Handler ---
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    path_params = event.get("pathParameters") or {}
+    restaurant_id = path_params.get("restaurantId") or query_params.get("restaurantId")
+
+    if not restaurant_id:
+        return respond(400, {"message": "Missing restaurantId"})
+
+    try:
+        limit = parse_limit(query_params.get("limit"))
+        since, seen = decode_since(query_params.get("since"), restaurant_id)
+        orders = read_feed(restaurant_id, limit, since, seen)
+    except ValueError as e:
+        return respond(400, {"message": str(e)})
+    except Exception as e:
+        print("ERROR:", str(e))
+        return respond(500, {"error": str(e)})
+
+    print(f"Feed for {restaurant_id}: {len(orders)} orders across {RESTAURANT_FEED_SHARDS} shards")
+    return respond(200, {
+        "restaurantId": restaurant_id,
+        "count": len(orders),
+        "orders": orders,
+        # Pass back as ?since= to receive only orders placed after these
+        "since": next_since(restaurant_id, orders, since, seen),
+    })
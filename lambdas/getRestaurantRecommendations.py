@@ -1,24 +1,221 @@
 import json
 import boto3
 import os
-
-personalize_runtime = boto3.client('personalize-runtime')
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from decimal import Decimal
+from botocore.config import Config
+from localRecommender import NeighborIndex
 
 CAMPAIGN_ARN = "arn:aws:personalize:us-east-1:875219264820:campaign/restaurant-recs-campaign"
+NUM_RESULTS = 10
+
+# 'personalize' calls the campaign; 'local' serves from the item-item neighbor file built by
+# Dataset/scripts/Recommender_Build.py (no Personalize needed: test, small regions)
+RECOMMENDER_BACKEND = os.environ.get('RECOMMENDER_BACKEND', 'personalize')
+LOCAL_RECOMMENDER_PATH = os.environ.get(
+    'LOCAL_RECOMMENDER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'restaurant_neighbors.bin')
+)
+
+# Personalize gets this long before the request is answered from the popularity list.
+# A late answer still lands in the cache for the user's next request.
+PERSONALIZE_BUDGET_SECONDS = float(os.environ.get('PERSONALIZE_BUDGET_SECONDS', '0.3'))
+
+RECS_CACHE_TTL_SECONDS = float(os.environ.get('RECS_CACHE_TTL_SECONDS', '600'))
+RECS_CACHE_MAX_ENTRIES = int(os.environ.get('RECS_CACHE_MAX_ENTRIES', '5000'))
+
+# Written by Dataset/scripts/Popular_Restaurants_Build.py (PK listId)
+LISTS_TABLE_NAME = os.environ.get('RECOMMENDATION_LISTS_TABLE', 'RecommendationLists')
+POPULAR_LIST_ID = 'popular'
+POPULAR_REFRESH_SECONDS = 3600
+# Used until the precomputed list can be read (cold start with DynamoDB unavailable)
+DEFAULT_POPULAR = ['1', '2', '3', '4', '5', '6']
+
+# ?hydrate=true: restaurant summaries and rating aggregates, read together in one BatchGetItem
+RESTAURANTS_TABLE_NAME = os.environ.get('RESTAURANTS_TABLE', 'Restaurants')
+AGGREGATES_TABLE_NAME = os.environ.get('RATING_AGGREGATES_TABLE', 'RestaurantRatingAggregates')
+MAX_BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BASE_DELAY_SECONDS = 0.05
+
+personalize_runtime = boto3.client(
+    'personalize-runtime',
+    config=Config(connect_timeout=1, read_timeout=2, retries={'max_attempts': 1})
+)
+dynamodb = boto3.resource('dynamodb')
+lists_table = dynamodb.Table(LISTS_TABLE_NAME)
+
+# Personalize calls run here so the handler can stop waiting without cancelling them
+personalize_pool = ThreadPoolExecutor(max_workers=4)
+
+
+class RecommendationCache:
+    """Per-user restaurant id lists from Personalize, LRU-bounded with a TTL."""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl_seconds:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, restaurant_ids):
+        with self._lock:
+            self._entries[user_id] = (time.time(), restaurant_ids)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+recommendation_cache = RecommendationCache(RECS_CACHE_MAX_ENTRIES, RECS_CACHE_TTL_SECONDS)
+popular_list = {'ids': DEFAULT_POPULAR, 'loaded_at': 0.0}
+
+
+def load_local_index():
+    """Memory-maps the neighbor file once per container; None keeps serving the popular list."""
+    if RECOMMENDER_BACKEND != 'local':
+        return None
+    try:
+        started = time.perf_counter()
+        index = NeighborIndex.load(LOCAL_RECOMMENDER_PATH)
+        print(f"Loaded {len(index.item_ids)} restaurants from {LOCAL_RECOMMENDER_PATH} "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return index
+    except (OSError, ValueError) as e:
+        print(f"Local recommender unavailable, serving popular: {e}")
+        return None
+
+
+local_index = load_local_index()
+
+
+def fetch_personalized(user_id):
+    response = personalize_runtime.get_recommendations(
+        campaignArn=CAMPAIGN_ARN,
+        userId=user_id,
+        numResults=NUM_RESULTS
+    )
+    restaurant_ids = [item["itemId"] for item in response.get("itemList", [])]
+    # An empty list means no history yet; caching it would hide the popular fallback
+    # for the whole TTL, even after the user's first orders reach Personalize
+    if restaurant_ids:
+        recommendation_cache.put(user_id, restaurant_ids)
+    return restaurant_ids
+
+
+def popular_restaurants():
+    """The precomputed popularity list, re-read at most once an hour per container."""
+    if time.time() - popular_list['loaded_at'] >= POPULAR_REFRESH_SECONDS:
+        popular_list['loaded_at'] = time.time()
+        try:
+            item = lists_table.get_item(Key={'listId': POPULAR_LIST_ID}).get('Item')
+            if item and item.get('restaurantIds'):
+                popular_list['ids'] = list(item['restaurantIds'])
+        except Exception as e:
+            print(f"Popular list unavailable, keeping the previous one: {e}")
+    return popular_list['ids'][:NUM_RESULTS]
+
+
+def recommend(user_id):
+    """Returns (restaurant_ids, source): source is cache, personalize, local or popular."""
+    if RECOMMENDER_BACKEND == 'local':
+        # Microseconds per call, so neither the cache nor the latency budget applies
+        restaurant_ids = local_index.recommend(user_id, NUM_RESULTS) if local_index else []
+        if restaurant_ids:
+            return restaurant_ids, 'local'
+        return popular_restaurants(), 'popular'
+
+    cached = recommendation_cache.get(user_id)
+    if cached:
+        return cached, 'cache'
+
+    future = personalize_pool.submit(fetch_personalized, user_id)
+    try:
+        restaurant_ids = future.result(timeout=PERSONALIZE_BUDGET_SECONDS)
+        if restaurant_ids:
+            return restaurant_ids, 'personalize'
+        # New users have no history yet
+    except FutureTimeoutError:
+        print(f"Personalize exceeded {PERSONALIZE_BUDGET_SECONDS}s for {user_id}; serving popular")
+    except Exception as e:
+        print(f"Personalize failed for {user_id}: {e}")
+    return popular_restaurants(), 'popular'
+
+
+def hydrate(restaurant_ids):
+    """Name, cuisine and rating for each restaurant, in the order given."""
+    if not restaurant_ids:
+        return []
+    request = {
+        RESTAURANTS_TABLE_NAME: {
+            'Keys': [{'restaurant_id': r_id} for r_id in restaurant_ids],
+            'ProjectionExpression': 'restaurant_id, #n, cuisine',
+            'ExpressionAttributeNames': {'#n': 'name'}
+        },
+        AGGREGATES_TABLE_NAME: {
+            'Keys': [{'restaurantId': r_id} for r_id in restaurant_ids],
+            'ProjectionExpression': 'restaurantId, ratingCount, ratingSum'
+        }
+    }
+    restaurants, aggregates = {}, {}
+    for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY_SECONDS * (2 ** attempt)))
+        response = dynamodb.batch_get_item(RequestItems=request)
+        responses = response.get('Responses', {})
+        for item in responses.get(RESTAURANTS_TABLE_NAME, []):
+            restaurants[item['restaurant_id']] = item
+        for item in responses.get(AGGREGATES_TABLE_NAME, []):
+            aggregates[item['restaurantId']] = item
+        request = response.get('UnprocessedKeys')
+        if not request:
+            break
+    else:
+        raise RuntimeError("Restaurant summaries were not processed after retries")
+
+    summaries = []
+    for r_id in restaurant_ids:
+        restaurant = restaurants.get(r_id)
+        if restaurant is None:
+            continue
+        aggregate = aggregates.get(r_id, {})
+        count = int(aggregate.get('ratingCount', 0))
+        summaries.append({
+            'id': r_id,
+            'name': restaurant.get('name'),
+            'cuisine': restaurant.get('cuisine'),
+            'rating': round(float(Decimal(aggregate['ratingSum']) / count), 2) if count else None,
+            'ratingCount': count
+        })
+    return summaries
+
 
 def lambda_handler(event, context):
     try:
         user_id = event["pathParameters"]["userId"]
+        query_params = event.get("queryStringParameters") or {}
 
-        response = personalize_runtime.get_recommendations(
-            campaignArn=CAMPAIGN_ARN,
-            userId=user_id,
-            numResults=10
-        )
-
-        restaurant_ids = [
-            item["itemId"] for item in response.get("itemList", [])
-        ]
+        restaurant_ids, source = recommend(user_id)
+        body = {
+            "userId": user_id,
+            "recommendedRestaurants": restaurant_ids,
+            "source": source
+        }
+        if query_params.get("hydrate") in ("1", "true"):
+            body["restaurants"] = hydrate(restaurant_ids)
 
         return {
             "statusCode": 200,
@@ -26,10 +223,7 @@ def lambda_handler(event, context):
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Headers": "*"
             },
-            "body": json.dumps({
-                "userId": user_id,
-                "recommendedRestaurants": restaurant_ids
-            })
+            "body": json.dumps(body)
         }
 
     except Exception as e:
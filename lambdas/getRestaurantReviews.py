@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+import boto3
+from collections import OrderedDict
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+# --- Configuration ---
+TABLE_NAME = "Ratings"
+# GSI on Ratings: partition key restaurantId, sort key createdAt (ISO-8601)
+REVIEWS_INDEX_NAME = os.environ.get("RESTAURANT_REVIEWS_INDEX", "RestaurantReviewsIndex")
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+# Only the first page (no cursor) is cached: that is what every restaurant page
+# view asks for, and a few seconds of staleness is fine for reviews
+FIRST_PAGE_CACHE_TTL_SECONDS = float(os.environ.get("REVIEWS_CACHE_TTL_SECONDS", "30"))
+FIRST_PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("REVIEWS_CACHE_MAX_ENTRIES", "256"))
+
+# Photos are returned as S3 keys rather than presigned URLs, so cached pages never
+# carry expiring links; the client resolves keys against the photo CDN. photoVariants
+# (thumb/large in WebP and AVIF, written by processReviewPhoto) is what pages should load.
+REVIEW_FIELDS = ("ratingId", "restaurantId", "createdAt", "userId", "rating", "comment", "photoKey", "photoVariants")
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(TABLE_NAME)
+
+# --- Helpers ---
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+def respond(status_code, body, cache_status=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "X-Cache",
+    }
+    if cache_status:
+        headers["X-Cache"] = cache_status
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": body if isinstance(body, str) else json.dumps(body, cls=DecimalEncoder),
+    }
+
+def parse_limit(raw_limit):
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw_limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(last_evaluated_key):
+    """Opaque, URL-safe cursor wrapping DynamoDB's LastEvaluatedKey."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, cls=DecimalEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor, restaurant_id):
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict) or key.get("restaurantId") != restaurant_id:
+        raise ValueError("Invalid cursor")
+    return key
+
+def format_review(item):
+    review = {field: item[field] for field in REVIEW_FIELDS if field in item}
+    # createRating stores "" when no photo was attached
+    review["photoKey"] = item.get("photoKey") or None
+    return review
+
+class FirstPageCache:
+    """Serialized first pages keyed by (restaurantId, limit), LRU-bounded with a short TTL."""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            loaded_at, body = entry
+            if time.time() - loaded_at >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = (time.time(), body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+first_page_cache = FirstPageCache(FIRST_PAGE_CACHE_MAX_ENTRIES, FIRST_PAGE_CACHE_TTL_SECONDS)
+
+def query_reviews_page(restaurant_id, limit, cursor=None):
+    """One indexed read: the newest `limit` reviews after the cursor. Returns (reviews, next_cursor)."""
+    names = {f"#f{i}": field for i, field in enumerate(REVIEW_FIELDS)}
+    query_args = {
+        "IndexName": REVIEWS_INDEX_NAME,
+        "KeyConditionExpression": Key("restaurantId").eq(restaurant_id),
+        "ScanIndexForward": False,
+        "Limit": limit,
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+    start_key = decode_cursor(cursor, restaurant_id)
+    if start_key is not None:
+        query_args["ExclusiveStartKey"] = start_key
+
+    response = table.query(**query_args)
+    reviews = [format_review(item) for item in response.get("Items", [])]
+    return reviews, encode_cursor(response.get("LastEvaluatedKey"))
+
+# --- Lambda Handler ---
+def lambda_handler(event, context):
+    query_params = event.get("queryStringParameters") or {}
+    path_params = event.get("pathParameters") or {}
+    restaurant_id = path_params.get("restaurantId") or query_params.get("restaurantId")
+
+    if not restaurant_id:
+        return respond(400, {"message": "Missing restaurantId"})
+
+    try:
+        limit = parse_limit(query_params.get("limit"))
+        cursor = query_params.get("cursor")
+
+        cache_key = (restaurant_id, limit)
+        if not cursor:
+            cached = first_page_cache.get(cache_key)
+            if cached is not None:
+                return respond(200, cached, "HIT")
+
+        reviews, next_cursor = query_reviews_page(restaurant_id, limit, cursor)
+    except ValueError as e:
+        return respond(400, {"message": str(e)})
+    except Exception as e:
+        print("ERROR:", str(e))
+        return respond(500, {"error": str(e)})
+
+    body = json.dumps({
+        "restaurantId": restaurant_id,
+        "reviews": reviews,
+        "nextCursor": next_cursor,
+    }, cls=DecimalEncoder)
+    if cursor:
+        return respond(200, body)
+    first_page_cache.put(cache_key, body)
+    return respond(200, body, "MISS")
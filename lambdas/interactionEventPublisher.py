@@ -0,0 +1,255 @@
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+
+# Feeds orders and ratings back to the Personalize event tracker so recommendations
+# follow what users actually do. Subscribed to two DynamoDB streams (ReportBatchItemFailures
+# enabled on both event source mappings):
+#   RestaurantOrders  INSERT                -> ORDER event for the restaurant
+#   Ratings           INSERT / star changed -> RATING event, eventValue = stars
+# Both streams are NEW_AND_OLD_IMAGES: RestaurantOrders has a single stream, shared with
+# orderStreamProcessor, which needs the old image for status transitions.
+# orderService and createRating are untouched: the streams are the buffer, so delivery never
+# adds latency to placing an order or saving a rating. Set BatchSize (e.g. 500) and
+# MaximumBatchingWindowInSeconds (e.g. 10) on the mappings so each invocation sends full batches.
+TRACKING_ID = os.environ.get('PERSONALIZE_TRACKING_ID')
+
+# PutEvents accepts up to 10 events, all for one user and session
+MAX_EVENTS_PER_CALL = 10
+# Backpressure: at most this many PutEvents calls in flight, paced by a shared rate limit
+# that halves whenever Personalize throttles and creeps back up as calls succeed
+MAX_IN_FLIGHT = int(os.environ.get('EVENT_PUBLISH_CONCURRENCY', '8'))
+MAX_CALLS_PER_SECOND = float(os.environ.get('EVENT_PUBLISH_RATE', '50'))
+MIN_CALLS_PER_SECOND = 1.0
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 0.1
+# Stop starting new calls this close to the Lambda timeout; the rest is redelivered
+DEADLINE_MARGIN_MS = 5000
+
+RETRYABLE_ERRORS = {'ThrottlingException', 'InternalFailure', 'ServiceUnavailable', 'ServiceUnavailableException'}
+THROTTLING_ERRORS = {'ThrottlingException'}
+# Problems with the events themselves: retrying never helps and would block the shard, so
+# they are logged and dropped. Any other error (AccessDenied, ResourceNotFound for a wrong
+# tracking id, ...) is configuration and fails the batch, so nothing is lost while it's fixed.
+DROPPABLE_ERRORS = {'InvalidInputException', 'ValidationException'}
+
+# 'aws' calls personalize-events; 'local' records the calls in memory (LocalEventTracker)
+PIPELINE_BACKEND = os.environ.get('INTERACTION_EVENTS_BACKEND', 'aws')
+
+deserializer = TypeDeserializer()
+
+
+# --- Event trackers ---
+
+class AwsEventTracker:
+    def __init__(self):
+        if not TRACKING_ID:
+            raise RuntimeError('PERSONALIZE_TRACKING_ID is not set')
+        # Retries are ours (with the shared rate limit), not botocore's
+        self.client = boto3.client(
+            'personalize-events',
+            config=Config(connect_timeout=2, read_timeout=5, retries={'max_attempts': 1},
+                          max_pool_connections=MAX_IN_FLIGHT)
+        )
+
+    def put_events(self, user_id, events):
+        self.client.put_events(trackingId=TRACKING_ID, userId=user_id, sessionId=user_id, eventList=events)
+
+
+class LocalEventTracker:
+    """In-memory stand-in; throttle_calls makes the next N calls fail like an overloaded tracker."""
+
+    def __init__(self, throttle_calls=0):
+        self.calls = []
+        self.throttle_calls = throttle_calls
+        self._lock = threading.Lock()
+
+    def put_events(self, user_id, events):
+        with self._lock:
+            if self.throttle_calls > 0:
+                self.throttle_calls -= 1
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, 'PutEvents')
+            self.calls.append({'userId': user_id, 'eventList': events})
+
+
+class RateLimiter:
+    """Shared pacing for all workers: additive increase on success, halve on throttling."""
+
+    def __init__(self, calls_per_second):
+        self.max_rate = calls_per_second
+        self.rate = calls_per_second
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 1.0)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(MIN_CALLS_PER_SECOND, self.rate / 2)
+
+
+tracker = LocalEventTracker() if PIPELINE_BACKEND == 'local' else AwsEventTracker()
+rate_limiter = RateLimiter(MAX_CALLS_PER_SECOND)
+
+
+# --- Record -> event ---
+
+def read_image(record, name):
+    image = record.get('dynamodb', {}).get(name)
+    if not image:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+
+def sent_at(timestamp):
+    """Item timestamps are naive UTC ISO strings; fall back to now for old rows without one."""
+    try:
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+def to_interaction(record):
+    """(userId, event) for records that are interactions, otherwise None."""
+    new_item = read_image(record, 'NewImage')
+    if not new_item or record.get('eventName') not in ('INSERT', 'MODIFY'):
+        return None
+    if not new_item.get('userId') or not new_item.get('restaurantId'):
+        return None     # legacy name-only orders have no item to attribute the event to
+
+    if 'userOrderId' in new_item:
+        # Ratings: MODIFY also fires for photo variants and comment edits; only star changes count
+        old_item = read_image(record, 'OldImage') or {}
+        if record['eventName'] == 'MODIFY' and old_item.get('rating') == new_item.get('rating'):
+            return None
+        event = {
+            # Same id on a redelivered record, so duplicates are identifiable downstream
+            'eventId': f"rating#{new_item['userOrderId']}#{int(new_item['rating'])}",
+            'eventType': 'RATING',
+            'eventValue': float(new_item['rating']),
+            'itemId': str(new_item['restaurantId']),
+            'sentAt': sent_at(new_item.get('createdAt')),
+        }
+    else:
+        if record['eventName'] != 'INSERT':
+            return None     # status changes are lifecycle, not new interactions
+        event = {
+            'eventId': f"order#{new_item['orderId']}",
+            'eventType': 'ORDER',
+            'itemId': str(new_item['restaurantId']),
+            'sentAt': sent_at(new_item.get('timestamp')),
+        }
+    return str(new_item['userId']), event
+
+
+# --- Delivery ---
+
+def put_with_retry(user_id, events):
+    """
+    True when delivered (or rejected as invalid and logged), False when retries
+    ran out or the tracker is misconfigured.
+    """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        rate_limiter.acquire()
+        try:
+            tracker.put_events(user_id, events)
+            rate_limiter.succeeded()
+            return True
+        except ClientError as e:
+            code = e.response['Error']['Code']
+            if code in DROPPABLE_ERRORS:
+                print(f"Dropping {len(events)} invalid events for {user_id}: {code} {e}")
+                return True
+            if code not in RETRYABLE_ERRORS:
+                print(f"ERROR delivering events for {user_id}: {code} {e}")
+                return False
+            if code in THROTTLING_ERRORS:
+                rate_limiter.throttled()
+            print(f"PutEvents attempt {attempt} failed for {user_id}: {code}")
+        except (BotocoreConnectionError, HTTPClientError) as e:
+            # ReadTimeoutError, EndpointConnectionError, ...: not ClientErrors, but just as transient
+            print(f"PutEvents attempt {attempt} failed for {user_id}: {e}")
+        if attempt < MAX_ATTEMPTS:
+            time.sleep(random.uniform(0, BASE_BACKOFF_SECONDS * 2 ** attempt))
+    print(f"Giving up on {len(events)} events for {user_id} after {MAX_ATTEMPTS} attempts")
+    return False
+
+
+def deliver_user(user_id, entries, out_of_time):
+    """
+    Sends one user's events in record order, 10 per call. Returns the index
+    of the first record that was not delivered, or None.
+    """
+    for start in range(0, len(entries), MAX_EVENTS_PER_CALL):
+        chunk = entries[start:start + MAX_EVENTS_PER_CALL]
+        if out_of_time() or not put_with_retry(user_id, [event for _, event in chunk]):
+            return chunk[0][0]
+    return None
+
+
+def publish_records(records, out_of_time=lambda: False):
+    """
+    Returns the batchItemFailures list. Users are delivered in parallel, so on
+    a failure the earliest undelivered record is reported: Lambda redelivers it
+    and everything after it, and events after it that did go out are sent again
+    with the same eventId.
+    """
+    by_user = OrderedDict()
+    for index, record in enumerate(records):
+        interaction = to_interaction(record)
+        if interaction:
+            user_id, event = interaction
+            by_user.setdefault(user_id, []).append((index, event))
+    if not by_user:
+        return []
+
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as pool:
+        futures = {
+            user_id: pool.submit(deliver_user, user_id, entries, out_of_time)
+            for user_id, entries in by_user.items()
+        }
+        failed = []
+        for user_id, future in futures.items():
+            try:
+                first_failed = future.result()
+            except Exception as e:
+                print(f"ERROR delivering events for {user_id}: {e}")
+                first_failed = by_user[user_id][0][0]
+            if first_failed is not None:
+                failed.append(first_failed)
+
+    if not failed:
+        return []
+    sequence_number = records[min(failed)].get('dynamodb', {}).get('SequenceNumber')
+    return [{'itemIdentifier': sequence_number}]
+
+
+# --- Lambda Handler ---
+
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    out_of_time = lambda: context.get_remaining_time_in_millis() < DEADLINE_MARGIN_MS
+    failures = publish_records(records, out_of_time)
+    if failures:
+        print(f"Reporting failure at {failures[0]['itemIdentifier']} in a batch of {len(records)}")
+    else:
+        print(f"Published interactions from {len(records)} stream records")
+    return {'batchItemFailures': failures}
@@ -1,10 +1,64 @@
+import hashlib
 import json
+import os
+import random
+import threading
+import time
 import boto3
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+ORDERS_TABLE_NAME = 'RestaurantOrders'
 
 dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('RestaurantOrders')
+table = dynamodb.Table(ORDERS_TABLE_NAME)
+
+# Idempotent order creation: clients send an Idempotency-Key header (or "idempotencyKey"
+# in the body). The key record (PK "idempotencyKey", DynamoDB TTL on "expiresAt") is
+# written in the same transaction as the order, so a replay can never create a second one.
+IDEMPOTENCY_TABLE_NAME = os.environ.get('IDEMPOTENCY_TABLE', 'OrderIdempotencyKeys')
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 60 * 60)))
+REPLAY_CACHE_MAX_ENTRIES = 1024
+REPLAY_CACHE_TTL_SECONDS = 10 * 60
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+idempotency_table = dynamodb.Table(IDEMPOTENCY_TABLE_NAME)
+
+# Bulk ingestion (kiosk / partner channels): {"orders": [...]} is written with
+# BatchWriteItem in chunks of 25, chunks in parallel, unprocessed items retried with backoff
+MAX_BULK_ORDERS = int(os.environ.get('MAX_BULK_ORDERS', '500'))
+BATCH_WRITE_SIZE = 25
+BULK_WRITE_WORKERS = int(os.environ.get('BULK_WRITE_WORKERS', '4'))
+MAX_BATCH_WRITE_ATTEMPTS = 5
+BATCH_WRITE_BASE_DELAY_SECONDS = 0.05
+# Worth resending the chunk; anything else is about an item and is retried one order at a time
+RETRYABLE_WRITE_ERRORS = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException',
+    'RequestLimitExceeded', 'InternalServerError', 'ServiceUnavailable'
+}
+# Chunks are written through the resource's client, which (unlike the resource itself)
+# is thread-safe and serializes plain values, on a pool that lives across warm invocations
+bulk_write_pool = ThreadPoolExecutor(max_workers=BULK_WRITE_WORKERS)
+
+# Server-side pricing: items given as [{"menu_item_id": ..., "quantity": n}] are priced
+# against RestaurantMenu (PK restaurant_id, SK menu_item_id) instead of trusting totalAmount.
+MENU_TABLE_NAME = 'RestaurantMenu'
+PRICE_INDEX_TTL_SECONDS = float(os.environ.get('PRICE_INDEX_TTL_SECONDS', '60'))
+PRICE_INDEX_MAX_ENTRIES = int(os.environ.get('PRICE_INDEX_MAX_ENTRIES', '5000'))
+BATCH_GET_SIZE = 100          # BatchGetItem limit, and so the cap on distinct items per order
+MAX_BATCH_GET_ATTEMPTS = 5
+MAX_ITEM_QUANTITY = 99
+CENTS = Decimal('0.01')
+
+# Kitchen order feed: open orders carry restaurantShard = "<restaurantId>#<n>", the partition
+# key of the sparse RestaurantFeedIndex GSI (sort key timestamp). Spreading a restaurant over
+# shards keeps busy locations from turning into hot partitions; getRestaurantOrders reads
+# all shards in parallel. Must match RESTAURANT_FEED_SHARDS there.
+RESTAURANT_FEED_SHARDS = int(os.environ.get('RESTAURANT_FEED_SHARDS', '8'))
 
 
 def normalize_items(raw_items):
@@ -35,17 +89,428 @@ def normalize_items(raw_items):
     return clean
 
 
+def feed_shard_key(restaurant_id, order_id):
+    return f"{restaurant_id}#{uuid.UUID(order_id).int % RESTAURANT_FEED_SHARDS}"
+
+
+def build_order_item(body, clean_items, amount):
+    order_id = str(uuid.uuid4())
+    order_item = {
+        'orderId': order_id,
+        'userId': body.get('userId'),
+        'restaurantId': body.get('restaurantId'),
+        'items': clean_items,
+        'amount': amount,
+        'paymentId': body.get('paymentId'),
+        'status': "ORDER_PLACED",
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    if body.get('restaurantId'):
+        order_item['restaurantShard'] = feed_shard_key(body['restaurantId'], order_id)
+    return order_item
+
+
+# --- Pricing ---
+
+class PriceIndex:
+    """
+    Warm-container cache of (restaurant_id, menu_item_id) -> {"name", "price"}.
+    Misses for a whole order are filled with one BatchGetItem; entries expire
+    after PRICE_INDEX_TTL_SECONDS so menu price changes show up quickly.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, keys):
+        """Prices for the given (restaurant_id, menu_item_id) keys; unknown items are left out."""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[0] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        for i in range(0, len(missing), BATCH_GET_SIZE):
+            rows = batch_get_prices(missing[i:i + BATCH_GET_SIZE])
+            found.update(rows)
+            with self._lock:
+                for key, row in rows.items():
+                    self._entries[key] = (now, row)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return found
+
+
+price_index = PriceIndex(PRICE_INDEX_MAX_ENTRIES, PRICE_INDEX_TTL_SECONDS)
+
+
+def batch_get_prices(keys):
+    """One BatchGetItem for up to 100 menu rows, retrying UnprocessedKeys with backoff."""
+    request = {
+        'Keys': [{'restaurant_id': r_id, 'menu_item_id': item_id} for r_id, item_id in keys],
+        'ProjectionExpression': 'restaurant_id, menu_item_id, #n, price',
+        'ExpressionAttributeNames': {'#n': 'name'}
+    }
+    rows = {}
+    for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY_SECONDS * (2 ** attempt)))
+        response = dynamodb.batch_get_item(RequestItems={MENU_TABLE_NAME: request})
+        for row in response.get('Responses', {}).get(MENU_TABLE_NAME, []):
+            rows[(row['restaurant_id'], row['menu_item_id'])] = {'name': row.get('name'), 'price': row['price']}
+        request = response.get('UnprocessedKeys', {}).get(MENU_TABLE_NAME)
+        if not request:
+            return rows
+    raise RuntimeError("Menu price lookup was not processed after retries")
+
+
+def is_priced_order(raw_items):
+    return (isinstance(raw_items, list) and bool(raw_items)
+            and all(isinstance(item, dict) and 'menu_item_id' in item for item in raw_items))
+
+
+def parse_line_items(raw_items):
+    """[{"menu_item_id": "12", "quantity": 2}, ...] -> {"12": 2, ...}, merging repeated items."""
+    quantities = {}
+    for item in raw_items:
+        quantity = item.get('quantity', 1)
+        # No int(): it would truncate 2.7 to 2 and accept true as 1
+        if isinstance(quantity, Decimal) and quantity == quantity.to_integral_value():
+            quantity = int(quantity)
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError("quantity must be an integer")
+        if quantity < 1:
+            raise ValueError(f"quantity must be between 1 and {MAX_ITEM_QUANTITY}")
+        menu_item_id = str(item['menu_item_id'])
+        quantities[menu_item_id] = quantities.get(menu_item_id, 0) + quantity
+    if len(quantities) > BATCH_GET_SIZE:
+        raise ValueError(f"At most {BATCH_GET_SIZE} distinct menu items per order")
+    for menu_item_id, quantity in quantities.items():
+        if quantity > MAX_ITEM_QUANTITY:
+            raise ValueError(f"quantity must be between 1 and {MAX_ITEM_QUANTITY}")
+    return quantities
+
+
+def price_keys(body):
+    """The price index keys a priced order needs (empty for legacy name-only orders)."""
+    if not is_priced_order(body.get('items')):
+        return []
+    restaurant_id = str(body.get('restaurantId'))
+    return [(restaurant_id, str(item['menu_item_id'])) for item in body['items']]
+
+
+def prepare_order_items(body, prices=None):
+    """
+    Returns (clean_items, amount). Priced orders are re-priced from the menu and
+    the client's totalAmount is ignored; name-only orders keep the legacy shape.
+    Raises ValueError for anything the client has to fix.
+    """
+    items = body.get('items')
+    if not is_priced_order(items):
+        # A single priced entry must not slip the whole order through at the client's total
+        if isinstance(items, list) and any(isinstance(item, dict) and 'menu_item_id' in item for item in items):
+            raise ValueError("Either every item or none carries menu_item_id")
+        return normalize_items(items), body.get('totalAmount')
+
+    if not body.get('restaurantId'):
+        raise ValueError("restaurantId is required when items carry menu_item_id")
+    restaurant_id = str(body['restaurantId'])
+    quantities = parse_line_items(items)
+    if prices is None:
+        prices = price_index.lookup([(restaurant_id, menu_item_id) for menu_item_id in quantities])
+
+    unknown = [menu_item_id for menu_item_id in quantities if (restaurant_id, menu_item_id) not in prices]
+    if unknown:
+        raise ValueError(f"Unknown menu items for restaurant {restaurant_id}: {', '.join(unknown)}")
+
+    clean_items = []
+    total = Decimal('0')
+    for menu_item_id, quantity in quantities.items():
+        row = prices[(restaurant_id, menu_item_id)]
+        unit_price = Decimal(str(row['price']))
+        clean_items.append({
+            'menu_item_id': menu_item_id,
+            'name': row['name'],
+            'quantity': quantity,
+            'unitPrice': unit_price
+        })
+        total += unit_price * quantity
+
+    return clean_items, total.quantize(CENTS)
+
+
+class ReplayCache:
+    """
+    Recently seen idempotency keys -> (request hash, orderId, amount), kept across warm
+    invocations so retry storms are answered without touching DynamoDB.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1:]
+
+    def put(self, key, request_hash, order_id, amount):
+        with self._lock:
+            self._entries[key] = (time.time(), request_hash, order_id, amount)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+replay_cache = ReplayCache(REPLAY_CACHE_MAX_ENTRIES, REPLAY_CACHE_TTL_SECONDS)
+
+
+def get_idempotency_key(event, body):
+    headers = event.get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'idempotency-key' and value:
+            return value.strip()
+    key = body.get('idempotencyKey')
+    return str(key).strip() if key else None
+
+
+def request_fingerprint(body):
+    """Hash of the order payload, so a key reused for a different order can be rejected."""
+    payload = {k: v for k, v in body.items() if k != 'idempotencyKey'}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def order_created_response(order_id, amount, replayed=False):
+    """amount is what the order was stored with (server-computed for priced orders)."""
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*"
+    }
+    if replayed:
+        headers["Idempotent-Replayed"] = "true"
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            "message": "Order Created",
+            "orderId": order_id,
+            "amount": float(amount) if amount is not None else None
+        })
+    }
+
+
+def replay_response(scoped_key, request_hash, original):
+    original_hash, original_order_id, original_amount = original
+    if original_hash != request_hash:
+        return {
+            'statusCode': 422,
+            'body': json.dumps({"message": "Idempotency-Key was already used for a different order"})
+        }
+    print(f"Idempotent replay for {scoped_key}: returning order {original_order_id}")
+    return order_created_response(original_order_id, original_amount, replayed=True)
+
+
+def put_order_idempotently(order_item, scoped_key, request_hash):
+    """
+    Write the key record and the order in one transaction. Returns None on
+    success, or the (request hash, orderId, amount) stored by the original
+    request when the key already exists.
+    """
+    key_item = {
+        'idempotencyKey': scoped_key,
+        'orderId': order_item['orderId'],
+        'amount': order_item['amount'],
+        'requestHash': request_hash,
+        'expiresAt': int(time.time()) + IDEMPOTENCY_TTL_SECONDS
+    }
+    try:
+        # The resource's client serializes plain values itself, like Table.put_item
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {
+                'Put': {
+                    'TableName': IDEMPOTENCY_TABLE_NAME,
+                    'Item': key_item,
+                    # Expired records may linger until the TTL sweeper runs
+                    'ConditionExpression': 'attribute_not_exists(idempotencyKey) OR expiresAt < :now',
+                    'ExpressionAttributeValues': {':now': int(time.time())}
+                }
+            },
+            {
+                'Put': {
+                    'TableName': ORDERS_TABLE_NAME,
+                    'Item': order_item,
+                    'ConditionExpression': 'attribute_not_exists(orderId)'
+                }
+            }
+        ])
+        return None
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or []
+        if not reasons or reasons[0].get('Code') != 'ConditionalCheckFailed':
+            raise
+
+    original = idempotency_table.get_item(Key={'idempotencyKey': scoped_key}, ConsistentRead=True).get('Item')
+    if not original:
+        raise RuntimeError(f"Idempotency record for {scoped_key} vanished during replay")
+    # Records written before amounts were stored replay without one
+    return original['requestHash'], original['orderId'], original.get('amount')
+
+
+# --- Bulk ingestion ---
+
+def validate_bulk_order(order, prices):
+    """Returns (order_item, None) or (None, reason)."""
+    if not isinstance(order, dict):
+        return None, "Order must be an object"
+    if not order.get('userId') or not order.get('items'):
+        return None, "Missing userId or items"
+    try:
+        clean_items, amount = prepare_order_items(order, prices)
+    except ValueError as e:
+        return None, str(e)
+    return build_order_item(order, clean_items, amount), None
+
+
+def write_orders_individually(order_items):
+    """
+    Fallback when BatchWriteItem rejects a chunk outright (one bad item fails all
+    25): each order is written on its own so only the culprit is reported.
+    """
+    failures = {}
+    for item in order_items:
+        try:
+            dynamodb.meta.client.put_item(TableName=ORDERS_TABLE_NAME, Item=item)
+        except Exception as e:
+            failures[item['orderId']] = str(e)
+    return failures
+
+
+def write_order_chunk(order_items):
+    """
+    BatchWriteItem one chunk (<= 25 orders), retrying UnprocessedItems with
+    exponential backoff and full jitter. Returns {orderId: error} for the
+    orders that never made it.
+    """
+    pending = [{'PutRequest': {'Item': item}} for item in order_items]
+
+    for attempt in range(MAX_BATCH_WRITE_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY_SECONDS * (2 ** attempt)))
+        try:
+            response = dynamodb.meta.client.batch_write_item(RequestItems={ORDERS_TABLE_NAME: pending})
+        except ClientError as e:
+            if e.response['Error']['Code'] not in RETRYABLE_WRITE_ERRORS:
+                print(f"BatchWriteItem rejected the chunk ({e}); writing its orders one by one")
+                return write_orders_individually([request['PutRequest']['Item'] for request in pending])
+            # Throttling that outlasted botocore's own retries: back off and resend the chunk
+            print(f"BatchWriteItem attempt {attempt + 1} failed: {e}")
+            continue
+        except (TypeError, ValueError) as e:
+            # Serialization errors (e.g. a float attribute) are about one item, too
+            print(f"Chunk could not be serialized ({e}); writing its orders one by one")
+            return write_orders_individually([request['PutRequest']['Item'] for request in pending])
+        pending = response.get('UnprocessedItems', {}).get(ORDERS_TABLE_NAME, [])
+        if not pending:
+            return {}
+
+    return {request['PutRequest']['Item']['orderId']: "Write not processed after retries" for request in pending}
+
+
+def handle_bulk_orders(orders):
+    if not isinstance(orders, list) or not orders:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({"message": "orders must be a non-empty list"})
+        }
+    if len(orders) > MAX_BULK_ORDERS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({"message": f"At most {MAX_BULK_ORDERS} orders per request"})
+        }
+
+    # Price every order in the request from one shared lookup (100 keys per BatchGetItem)
+    keys = []
+    for order in orders:
+        if isinstance(order, dict) and order.get('restaurantId'):
+            keys.extend(price_keys(order))
+    prices = price_index.lookup(keys)
+
+    results = [None] * len(orders)
+    order_items = []
+    for index, order in enumerate(orders):
+        order_item, error = validate_bulk_order(order, prices)
+        if error:
+            results[index] = {'index': index, 'status': 'rejected', 'error': error}
+        else:
+            results[index] = {'index': index, 'status': 'created', 'orderId': order_item['orderId']}
+            order_items.append(order_item)
+
+    chunks = [order_items[i:i + BATCH_WRITE_SIZE] for i in range(0, len(order_items), BATCH_WRITE_SIZE)]
+    failures = {}
+    if chunks:
+        futures = [(chunk, bulk_write_pool.submit(write_order_chunk, chunk)) for chunk in chunks]
+        for chunk, future in futures:
+            try:
+                failures.update(future.result())
+            except Exception as e:
+                # Other chunks may already be committed: report this one per order, don't 500
+                print(f"Chunk write failed: {e}")
+                failures.update({item['orderId']: str(e) for item in chunk})
+
+    for result in results:
+        if result.get('orderId') in failures:
+            result['status'] = 'failed'
+            result['error'] = failures[result['orderId']]
+
+    summary = {status: sum(1 for r in results if r['status'] == status)
+               for status in ('created', 'rejected', 'failed')}
+    print(f"Bulk order ingestion: {summary}")
+
+    return {
+        'statusCode': 200 if summary['created'] == len(results) else 207,
+        'headers': {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*"
+        },
+        'body': json.dumps({
+            "message": "Bulk orders processed",
+            "summary": summary,
+            "results": results
+        })
+    }
+
+
 def lambda_handler(event, context):
     print("Create Order Request:", json.dumps(event))
 
     try:
-        body = json.loads(event.get('body', '{}')) if event.get('body') else {}
+        # Decimal, not float: DynamoDB rejects floats (totalAmount in legacy orders)
+        body = json.loads(event.get('body', '{}'), parse_float=Decimal) if event.get('body') else {}
+
+        if 'orders' in body:
+            return handle_bulk_orders(body['orders'])
 
         user_id = body.get('userId')
         items = body.get('items')
-        total_amount = body.get('totalAmount')
-        restaurant_id = body.get('restaurantId')
-        payment_id = body.get('paymentId')
 
         if not user_id or not items:
             return {
@@ -53,36 +518,44 @@ def lambda_handler(event, context):
                 'body': json.dumps({"message": "Missing userId or items"})
             }
 
+        # Replays of a keyed request are answered from the warm container when possible
+        idempotency_key = get_idempotency_key(event, body)
+        if idempotency_key and len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({"message": "Idempotency-Key is too long"})
+            }
+        scoped_key = f"{user_id}#{idempotency_key}" if idempotency_key else None
+        request_hash = request_fingerprint(body) if scoped_key else None
+        if scoped_key:
+            cached = replay_cache.get(scoped_key)
+            if cached:
+                return replay_response(scoped_key, request_hash, cached)
+
     
-        clean_items = normalize_items(items)
-        print("CLEAN ITEMS TO SAVE:", json.dumps(clean_items))
-
-        order_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().isoformat()
-
-        order_item = {
-            'orderId': order_id,
-            'userId': user_id,
-            'restaurantId': restaurant_id,
-            'items': clean_items, 
-            'amount': total_amount,
-            'paymentId': payment_id,
-            'status': "ORDER_PLACED",
-            'timestamp': timestamp
-        }
+        try:
+            clean_items, amount = prepare_order_items(body)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({"message": str(e)})
+            }
+        print("CLEAN ITEMS TO SAVE:", json.dumps(clean_items, default=str))
 
-        table.put_item(Item=order_item)  
-        return {
-            'statusCode': 200,
-            'headers': {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*"
-            },
-            'body': json.dumps({
-                "message": "Order Created",
-                "orderId": order_id
-            })
-        }
+        order_item = build_order_item(body, clean_items, amount)
+        order_id = order_item['orderId']
+
+        if not scoped_key:
+            table.put_item(Item=order_item)
+            return order_created_response(order_id, amount)
+
+        original = put_order_idempotently(order_item, scoped_key, request_hash)
+        if original:
+            replay_cache.put(scoped_key, *original)
+            return replay_response(scoped_key, request_hash, original)
+
+        replay_cache.put(scoped_key, request_hash, order_id, amount)
+        return order_created_response(order_id, amount)
 
     except Exception as e:
         print("ERROR:", str(e))
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import boto3
+from collections import deque
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Consumes the RestaurantOrders DynamoDB stream (NEW_AND_OLD_IMAGES, with
+# ReportBatchItemFailures enabled on the event source mapping). Everything that
+# used to happen - or would have to happen - on the request path runs here:
+#   INSERT ORDER_PLACED        -> confirm the order (ORDER_PLACED -> ORDER_CONFIRMED)
+#   any status change          -> customer notification on the OrderUpdates topic
+#   any insert / status change -> event on the fan-out topic for downstream consumers
+#   DELIVERED / CANCELLED      -> drop the order from the kitchen feed (sparse RestaurantFeedIndex)
+ORDERS_TABLE_NAME = 'RestaurantOrders'
+SNS_TOPIC_ARN = os.environ.get('ORDER_UPDATES_TOPIC_ARN', 'arn:aws:sns:us-east-1:875219264820:OrderUpdates')
+# Optional: SQS queues / Lambdas that want every lifecycle event subscribe to this topic
+ORDER_EVENTS_TOPIC_ARN = os.environ.get('ORDER_EVENTS_TOPIC_ARN')
+
+# 'aws' talks to DynamoDB and SNS; 'local' keeps orders and messages in memory (see simulate())
+PIPELINE_BACKEND = os.environ.get('ORDER_PIPELINE_BACKEND', 'aws')
+
+# Transitions the worker performs on its own; the rest come from statusService
+AUTOMATIC_TRANSITIONS = {
+    'ORDER_PLACED': 'ORDER_CONFIRMED',
+}
+# Orders in these states leave the open-order feed read by getRestaurantOrders
+TERMINAL_STATUSES = {'DELIVERED', 'CANCELLED'}
+ALLOWED_TRANSITIONS = {
+    'ORDER_PLACED': {'ORDER_CONFIRMED', 'CANCELLED'},
+    'ORDER_CONFIRMED': {'PREPARING', 'OUT_FOR_DELIVERY', 'DELIVERED', 'CANCELLED'},
+    'PREPARING': {'OUT_FOR_DELIVERY', 'DELIVERED', 'CANCELLED'},
+    'OUT_FOR_DELIVERY': {'DELIVERED'},
+}
+
+deserializer = TypeDeserializer()
+serializer = TypeSerializer()
+
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super().default(obj)
+
+
+# --- Side effects ---
+
+class AwsSideEffects:
+    def __init__(self):
+        self.table = boto3.resource('dynamodb').Table(ORDERS_TABLE_NAME)
+        self.sns = boto3.client('sns')
+
+    def transition(self, order_id, from_status, to_status):
+        """Conditional status update. False if the order already moved on (a redelivered record)."""
+        try:
+            self.table.update_item(
+                Key={'orderId': order_id},
+                UpdateExpression='SET #s = :to',
+                ConditionExpression='#s = :from',
+                ExpressionAttributeNames={'#s': 'status'},
+                ExpressionAttributeValues={':to': to_status, ':from': from_status}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def close_feed_entry(self, order_id):
+        """Removing the shard key takes the order out of the sparse feed index."""
+        try:
+            self.table.update_item(
+                Key={'orderId': order_id},
+                UpdateExpression='REMOVE restaurantShard',
+                # An unconditional update would recreate an order deleted since the record
+                ConditionExpression='attribute_exists(orderId)'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def publish(self, topic_arn, subject, message):
+        self.sns.publish(TopicArn=topic_arn, Subject=subject, Message=message)
+
+
+class LocalSideEffects:
+    """
+    In-memory stand-in for DynamoDB + SNS. Status updates are applied to
+    self.orders and the resulting MODIFY record is queued on self.stream, the
+    way the real table would emit it.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.stream = deque()
+        self.published = []
+        self.fail_order_ids = set()
+        self._sequence = 0
+
+    def emit(self, event_name, new_image=None, old_image=None):
+        self._sequence += 1
+        dynamodb = {'SequenceNumber': str(self._sequence).zfill(21)}
+        if new_image is not None:
+            dynamodb['NewImage'] = {k: serializer.serialize(v) for k, v in new_image.items()}
+        if old_image is not None:
+            dynamodb['OldImage'] = {k: serializer.serialize(v) for k, v in old_image.items()}
+        self.stream.append({'eventName': event_name, 'eventSource': 'aws:dynamodb', 'dynamodb': dynamodb})
+
+    def put_order(self, order):
+        self.orders[order['orderId']] = dict(order)
+        self.emit('INSERT', new_image=order)
+
+    def transition(self, order_id, from_status, to_status):
+        if order_id in self.fail_order_ids:
+            raise RuntimeError(f"Simulated failure for order {order_id}")
+        order = self.orders.get(order_id)
+        if not order or order.get('status') != from_status:
+            return False
+        old_image = dict(order)
+        order['status'] = to_status
+        self.emit('MODIFY', new_image=dict(order), old_image=old_image)
+        return True
+
+    def close_feed_entry(self, order_id):
+        order = self.orders.get(order_id)
+        if order and 'restaurantShard' in order:
+            old_image = dict(order)
+            del order['restaurantShard']
+            self.emit('MODIFY', new_image=dict(order), old_image=old_image)
+
+    def publish(self, topic_arn, subject, message):
+        self.published.append({'topic': topic_arn, 'subject': subject, 'message': message})
+        print(f"[local sns] {subject}: {message}")
+
+
+side_effects = LocalSideEffects() if PIPELINE_BACKEND == 'local' else AwsSideEffects()
+
+
+# --- Record processing ---
+
+def read_image(record, name):
+    image = record.get('dynamodb', {}).get(name)
+    if not image:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+
+def lifecycle_event(order, previous_status):
+    return json.dumps({
+        'type': 'ORDER_STATUS_CHANGED',
+        'orderId': order.get('orderId'),
+        'userId': order.get('userId'),
+        'restaurantId': order.get('restaurantId'),
+        'status': order.get('status'),
+        'previousStatus': previous_status,
+        'items': order.get('items'),
+        'amount': order.get('amount'),
+        'timestamp': order.get('timestamp')
+    }, cls=DecimalEncoder)
+
+
+def process_record(record, effects):
+    event_name = record.get('eventName')
+    if event_name not in ('INSERT', 'MODIFY'):
+        return
+
+    new_order = read_image(record, 'NewImage') or {}
+    old_order = read_image(record, 'OldImage') or {}
+    order_id = new_order.get('orderId')
+    status = new_order.get('status')
+    previous_status = old_order.get('status')
+
+    # Only lifecycle changes matter; other attribute updates pass through
+    if event_name == 'MODIFY' and status == previous_status:
+        return
+    if previous_status and status not in ALLOWED_TRANSITIONS.get(previous_status, set()):
+        print(f"Unexpected transition for {order_id}: {previous_status} -> {status}")
+
+    # Transition first: if a publish below fails, the redelivered record finds the
+    # order already confirmed and only the notifications are retried
+    next_status = AUTOMATIC_TRANSITIONS.get(status)
+    if event_name == 'INSERT' and next_status:
+        if not effects.transition(order_id, status, next_status):
+            print(f"Order {order_id} already moved past {status}")
+    if status in TERMINAL_STATUSES and new_order.get('restaurantShard'):
+        effects.close_feed_entry(order_id)
+
+    effects.publish(
+        SNS_TOPIC_ARN,
+        'Restaurant Order Update',
+        f"Update for Order #{order_id}: Your order is now {status}!"
+    )
+    if ORDER_EVENTS_TOPIC_ARN:
+        effects.publish(ORDER_EVENTS_TOPIC_ARN, 'ORDER_STATUS_CHANGED', lifecycle_event(new_order, previous_status))
+
+
+def process_records(records, effects):
+    """
+    Returns the batchItemFailures list. Stream records are ordered per shard, so
+    processing stops at the first failure: Lambda retries from that record and
+    everything after it is redelivered.
+    """
+    for record in records:
+        try:
+            process_record(record, effects)
+        except Exception as e:
+            sequence_number = record.get('dynamodb', {}).get('SequenceNumber')
+            print(f"ERROR processing record {sequence_number}: {e}")
+            return [{'itemIdentifier': sequence_number}]
+    return []
+
+
+# --- Lambda Handler ---
+
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    failures = process_records(records, side_effects)
+    if failures:
+        print(f"Reporting failure at {failures[0]['itemIdentifier']} in a batch of {len(records)}")
+    else:
+        print(f"Processed {len(records)} stream records")
+    return {'batchItemFailures': failures}
+
+
+# --- Local stand-in ---
+
+def simulate(orders, batch_size=10, max_batches=100, effects=None):
+    """
+    Feed orders through the worker without AWS: each order is inserted into the
+    in-memory table and the resulting stream is drained in batches, retrying from
+    the first reported failure like the event source mapping does. Pass a
+    LocalSideEffects with fail_order_ids set to exercise that path.
+    Returns the LocalSideEffects so callers can inspect orders and messages.
+    """
+    effects = effects or LocalSideEffects()
+    for order in orders:
+        effects.put_order(order)
+
+    for _ in range(max_batches):
+        if not effects.stream:
+            break
+        batch = [effects.stream.popleft() for _ in range(min(batch_size, len(effects.stream)))]
+        failures = process_records(batch, effects)
+        if failures:
+            failed = failures[0]['itemIdentifier']
+            retry = [r for r in batch if r['dynamodb']['SequenceNumber'] >= failed]
+            effects.stream.extendleft(reversed(retry))
+            print(f"Batch failed at {failed}; {len(retry)} records will be redelivered")
+    return effects
+
+
+if __name__ == '__main__':
+    # python orderStreamProcessor.py orders.json  (a JSON list of RestaurantOrders items)
+    with open(sys.argv[1]) as f:
+        orders = json.load(f, parse_float=Decimal)
+    result = simulate(orders)
+    print(json.dumps(result.orders, cls=DecimalEncoder, indent=2))
@@ -0,0 +1,210 @@
+import io
+import os
+import sys
+import time
+import boto3
+from urllib.parse import unquote_plus
+from botocore.exceptions import ClientError
+
+# Pillow ships in the Lambda layer (Dataset/requirements.txt); AVIF needs Pillow >= 11.3
+# built with libavif (the manylinux wheels are). Without it only WebP variants are produced.
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+# --- Configuration ---
+# Subscribe this function to s3:ObjectCreated:* on UPLOAD_PREFIX only; variants are
+# written under PROCESSED_PREFIX, so they never re-trigger it.
+UPLOAD_PREFIX = "uploads/"
+PROCESSED_PREFIX = os.environ.get("PHOTO_PROCESSED_PREFIX", "processed/")
+RATINGS_TABLE_NAME = "Ratings"
+# Variants by upload (PK photoKey, DynamoDB TTL on expiresAt). Written before the rating is
+# touched, so a rating saved after processing finishes picks them up in createRating instead
+# of depending on this function's retries. Uploads never attached to a rating expire.
+PHOTO_VARIANTS_TABLE_NAME = os.environ.get("PHOTO_VARIANTS_TABLE", "ReviewPhotoVariants")
+PHOTO_VARIANTS_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Longest edge in pixels; images are never upscaled
+VARIANT_SIZES = {
+    "thumb": 320,
+    "large": 1280,
+}
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+AVIF_SUPPORTED = features.check("avif")
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Phone photos are ~12-50 MP; anything far beyond that is rejected, not decoded
+MAX_IMAGE_PIXELS = 80_000_000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# 's3' for the deployed function; 'local' reads and writes under PHOTO_STORE_ROOT
+PHOTO_STORE = os.environ.get("PHOTO_STORE", "s3")
+PHOTO_STORE_ROOT = os.environ.get("PHOTO_STORE_ROOT", "./photo-store")
+
+s3 = boto3.client("s3")
+dynamodb = boto3.resource("dynamodb")
+ratings_table = dynamodb.Table(RATINGS_TABLE_NAME)
+variants_table = dynamodb.Table(PHOTO_VARIANTS_TABLE_NAME)
+
+# --- Storage ---
+class S3PhotoStore:
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def read(self, key):
+        return s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def write(self, key, data, content_type):
+        s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=VARIANT_CACHE_CONTROL,
+        )
+
+class LocalPhotoStore:
+    """Filesystem stand-in for the bucket: object keys are paths under root."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def read(self, key):
+        with open(os.path.join(self.root, key), "rb") as f:
+            return f.read()
+
+    def write(self, key, data, content_type):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+# --- Processing ---
+def parse_upload_key(key):
+    """uploads/{userId}/{orderId}/{file} -> (userId, orderId, file stem), as issued by generateUploadUrl."""
+    parts = key.split("/")
+    if len(parts) != 4 or parts[0] + "/" != UPLOAD_PREFIX or not all(parts[1:]):
+        raise ValueError(f"Not a review photo upload: {key}")
+    return parts[1], parts[2], os.path.splitext(parts[3])[0]
+
+def variant_key(user_id, order_id, stem, variant, extension):
+    return f"{PROCESSED_PREFIX}{user_id}/{order_id}/{stem}/{variant}.{extension}"
+
+def load_image(data):
+    """
+    Decode, apply the EXIF orientation to the pixels and drop all metadata.
+    Saving the returned image never writes EXIF (GPS, device serials, ...).
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        clean = image.convert("RGBA" if has_alpha else "RGB")
+    clean.info.clear()
+    return clean
+
+def encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+def build_variants(store, key):
+    """
+    Write every size/format variant of one upload. Returns the photoVariants
+    map recorded on the rating, e.g. {"thumb": {"webp": key, "avif": key, "width": 320, "height": 240}}.
+    """
+    user_id, order_id, stem = parse_upload_key(key)
+    image = load_image(store.read(key))
+
+    variants = {}
+    for variant, longest_edge in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((longest_edge, longest_edge), Image.LANCZOS)
+        entry = {"width": resized.width, "height": resized.height}
+
+        webp_key = variant_key(user_id, order_id, stem, variant, "webp")
+        store.write(webp_key, encode(resized, "WEBP", WEBP_QUALITY), "image/webp")
+        entry["webp"] = webp_key
+
+        if AVIF_SUPPORTED:
+            avif_key = variant_key(user_id, order_id, stem, variant, "avif")
+            store.write(avif_key, encode(resized, "AVIF", AVIF_QUALITY), "image/avif")
+            entry["avif"] = avif_key
+
+        variants[variant] = entry
+    return variants
+
+def save_pending_variants(variants_table, key, variants):
+    variants_table.put_item(Item={
+        "photoKey": key,
+        "variants": variants,
+        "expiresAt": int(time.time()) + PHOTO_VARIANTS_TTL_SECONDS,
+    })
+
+def record_variants(ratings_table, key, variants):
+    """
+    Attach the variants to the rating that references this upload. Returns
+    False when no rating references it yet: createRating attaches them from
+    the variants table when the rating is saved.
+    """
+    user_id, order_id, _ = parse_upload_key(key)
+    try:
+        ratings_table.update_item(
+            Key={"userOrderId": f"{user_id}#{order_id}"},
+            UpdateExpression="SET photoVariants = :variants",
+            ConditionExpression="photoKey = :key",
+            ExpressionAttributeValues={":variants": variants, ":key": key},
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+
+def process_upload(store, key, ratings_table=None, variants_table=None):
+    """Returns the variants, or None for uploads that are not usable images."""
+    if variants_table is not None:
+        # A retried event re-runs every record; the ones already done are skipped
+        done = variants_table.get_item(Key={"photoKey": key}, ConsistentRead=True).get("Item")
+        if done:
+            variants = done["variants"]
+            print(f"Variants for {key} already built")
+            if ratings_table is not None:
+                record_variants(ratings_table, key, variants)
+            return variants
+    try:
+        variants = build_variants(store, key)
+    except (ValueError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        # Retrying cannot fix a bad upload
+        print(f"Skipping {key}: {e}")
+        return None
+    print(f"Built {', '.join(variants)} variants for {key}")
+    # Pending record first: if the rating is saved in between, createRating finds it
+    if variants_table is not None:
+        save_pending_variants(variants_table, key, variants)
+    if ratings_table is not None and not record_variants(ratings_table, key, variants):
+        print(f"No rating references {key} yet; createRating will attach the variants")
+    return variants
+
+# --- Lambda Handler ---
+def lambda_handler(event, context):
+    records = event.get("Records", [])
+    failed = []
+    # Records are independent: one bad photo doesn't stop the others
+    for record in records:
+        key = unquote_plus(record["s3"]["object"]["key"])
+        try:
+            bucket = record["s3"]["bucket"]["name"]
+            store = LocalPhotoStore(PHOTO_STORE_ROOT) if PHOTO_STORE == "local" else S3PhotoStore(bucket)
+            process_upload(store, key, ratings_table, variants_table)
+        except Exception as e:
+            print(f"ERROR processing {key}: {e}")
+            failed.append(key)
+    if failed:
+        # The async retry re-sends the whole event; finished records are skipped above
+        raise RuntimeError(f"{len(failed)} of {len(records)} uploads failed: {', '.join(failed)}")
+    return {"processed": len(records)}
+
+if __name__ == "__main__":
+    # python processReviewPhoto.py <root> uploads/<userId>/<orderId>/<file>.jpg
+    # Builds the variants under <root>/processed/... without touching AWS.
+    root, upload_key = sys.argv[1], sys.argv[2]
+    print(process_upload(LocalPhotoStore(root), upload_key))
@@ -1,15 +1,11 @@
 import { DynamoDBClient } from "@aws-sdk/client-dynamodb";
 import { DynamoDBDocumentClient, UpdateCommand } from "@aws-sdk/lib-dynamodb";
-import { SNSClient, PublishCommand } from "@aws-sdk/client-sns";
 
 const ddbClient = new DynamoDBClient({});
 const docClient = DynamoDBDocumentClient.from(ddbClient);
-const snsClient = new SNSClient({});
 
 const TABLE_NAME = "RestaurantOrders";
 
-const SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:875219264820:OrderUpdates";
-
 export const handler = async (event) => {
   console.log("Status Update Request:", JSON.stringify(event));
 
@@ -36,15 +32,8 @@ export const handler = async (event) => {
 
     await docClient.send(updateCommand);
 
-    // 2. Send SNS Notification
-    const message = `Update for Order #${orderId}: Your order is now ${status}!`;
-    const publishCommand = new PublishCommand({
-      TopicArn: SNS_TOPIC_ARN,
-      Message: message,
-      Subject: "Restaurant Order Update",
-    });
-
-    await snsClient.send(publishCommand);
+    // The customer notification is sent by orderStreamProcessor when this
+    // status change reaches the RestaurantOrders stream, off the request path.
 
     return {
       statusCode: 200,
@@ -53,7 +42,7 @@ export const handler = async (event) => {
         "Access-Control-Allow-Origin": "*",
       },
       body: JSON.stringify({
-        message: "Status updated and notification sent",
+        message: "Status updated",
         newStatus: status,
       }),
     };
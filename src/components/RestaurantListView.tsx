@@ -36,6 +36,25 @@ const MENU_CATEGORY_IMAGES: Record<string, string> = {
     "https://images.unsplash.com/photo-1599490659213-e2b9527bd087?auto=format&fit=crop&w=800",
 };
 
+// Shown until a restaurant has its first rating
+const DEFAULT_RATING = 4.7;
+
+type RatingSummary = { count: number; average: number | null };
+
+// Rating aggregates are a nice-to-have; the list still renders without them
+async function loadRatingSummaries(
+  ids: number[]
+): Promise<Record<string, RatingSummary>> {
+  try {
+    const res = await fetch(`${API_BASE}/ratings/summary?ids=${ids.join(",")}`);
+    if (!res.ok) return {};
+    const { summaries = {} } = await res.json();
+    return summaries;
+  } catch {
+    return {};
+  }
+}
+
 const DEFAULT_MENU_IMAGE =
   "https://images.unsplash.com/photo-1504674900247-0877df9cc836?auto=format&fit=crop&w=800";
 
@@ -55,47 +74,54 @@ export function RestaurantListView({ onViewMenu }: RestaurantListViewProps) {
 
         const ids = [1, 2, 3, 4, 5, 6];
 
-        const result = await Promise.all(
-          ids.map(async (id) => {
-            const res = await fetch(`${API_BASE}/menu/${id}`);
-            if (!res.ok) throw new Error(`Restaurant ${id} not found`);
-
-            const items = await res.json();
-            if (!Array.isArray(items) || items.length === 0) return null;
-
-            const first = items[0];
-
-            const restaurantName: string = first.restaurant_name;
-            const restaurantImage =
-              restaurantImages[restaurantName] ?? DEFAULT_RESTAURANT_IMAGE;
-
-            const restaurant: Restaurant = {
-              id: String(first.restaurant_id),
-              name: restaurantName,
-              cuisine: first.cuisine,
-              description: `${first.cuisine} • Popular choices available`,
-              rating: 4.7,
-              deliveryTime: "20–40 min",
-              image: restaurantImage,
-              menu: items.map((item: any) => {
-                const category: string = item.category ?? "Food";
-                const menuImage =
-                  MENU_CATEGORY_IMAGES[category] ?? DEFAULT_MENU_IMAGE;
-
-                return {
-                  id: String(item.menu_item_id),
-                  name: item.name,
-                  description: item.description ?? "Delicious menu item",
-                  price: item.price,
-                  category,
-                  image: menuImage,
-                };
-              }),
-            };
-
-            return restaurant;
-          })
-        );
+        // One batched call instead of one request per restaurant
+        const [res, ratings] = await Promise.all([
+          fetch(`${API_BASE}/menu?ids=${ids.join(",")}`),
+          loadRatingSummaries(ids),
+        ]);
+        if (!res.ok) throw new Error("Failed to load restaurant menus");
+
+        const { menus = {}, errors = {} } = await res.json();
+        if (Object.keys(errors).length > 0) {
+          console.warn("Some restaurant menus failed to load:", errors);
+        }
+
+        const result = ids.map((id) => {
+          const items = menus[String(id)];
+          if (!Array.isArray(items) || items.length === 0) return null;
+
+          const first = items[0];
+
+          const restaurantName: string = first.restaurant_name;
+          const restaurantImage =
+            restaurantImages[restaurantName] ?? DEFAULT_RESTAURANT_IMAGE;
+
+          const restaurant: Restaurant = {
+            id: String(first.restaurant_id),
+            name: restaurantName,
+            cuisine: first.cuisine,
+            description: `${first.cuisine} • Popular choices available`,
+            rating: ratings[String(id)]?.average ?? DEFAULT_RATING,
+            deliveryTime: "20–40 min",
+            image: restaurantImage,
+            menu: items.map((item: any) => {
+              const category: string = item.category ?? "Food";
+              const menuImage =
+                MENU_CATEGORY_IMAGES[category] ?? DEFAULT_MENU_IMAGE;
+
+              return {
+                id: String(item.menu_item_id),
+                name: item.name,
+                description: item.description ?? "Delicious menu item",
+                price: item.price,
+                category,
+                image: menuImage,
+              };
+            }),
+          };
+
+          return restaurant;
+        });
 
         setRestaurants(result.filter(Boolean) as Restaurant[]);
       } catch (err: any) {